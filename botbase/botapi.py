@@ -1,104 +1,183 @@
 import asyncio
+import functools
 import logging
 import sys
 from contextlib import asynccontextmanager
 from importlib import import_module
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from botbase.config import AppConfig, ChannelConfig, config
 
-from botbase.channels.base import BaseChannel
-from botbase.config import ChannelConfig, config
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+
+    from botbase.channels.base import BaseChannel
 
 logger = logging.getLogger(__name__)
 
-_registered_channels: list[BaseChannel] = []
+_registered_channels: List["BaseChannel"] = []
+_initialized = False
+
 
+def _endpoint_name(route):
+    endpoint = getattr(route, "endpoint", None)
+    return getattr(endpoint, "__name__", endpoint)
+
+
+def _log_registered_routes(fastapi_app: "FastAPI"):
+    # Skip building the route dump entirely when INFO logs would be discarded anyway.
+    if not logger.isEnabledFor(logging.INFO):
+        return
 
-def _log_registered_routes(fastapi_app: FastAPI):
     logger.info("Registered routes at startup:")
     for route_idx, route in enumerate(fastapi_app.routes):
-        logger.info(f"Route #{route_idx}:")
-        if hasattr(route, "path"):
-            logger.info(f"  Name: {getattr(route, 'name', 'N/A')}")
-            logger.info(f"  Path: {route.path}")
-            logger.info(f"  Methods: {getattr(route, 'methods', 'N/A')}")
+        lines = [f"Route #{route_idx}:"]
+        path = getattr(route, "path", None)
+        if path is not None:
+            lines.append(f"  Name: {getattr(route, 'name', 'N/A')}")
+            lines.append(f"  Path: {path}")
+            lines.append(f"  Methods: {getattr(route, 'methods', 'N/A')}")
             if hasattr(route, "endpoint"):
-                logger.info(
-                    f"  Endpoint: {route.endpoint.__name__ if hasattr(route.endpoint, '__name__') else route.endpoint}"
-                )
+                lines.append(f"  Endpoint: {_endpoint_name(route)}")
         elif hasattr(route, "routes"):  # For APIRouters or mounted sub-applications
-            logger.info(f"  Router/Mount at prefix: {getattr(route, 'prefix', getattr(route, 'path_format', 'N/A'))}")
+            prefix = getattr(route, "prefix", None)
+            if prefix is None:
+                prefix = getattr(route, "path_format", "N/A")
+            lines.append(f"  Router/Mount at prefix: {prefix}")
             for sub_route_idx, sub_route in enumerate(route.routes):
-                if hasattr(sub_route, "path"):
-                    logger.info(f"    Sub-route #{sub_route_idx}:")
-                    logger.info(f"      Name: {getattr(sub_route, 'name', 'N/A')}")
-                    logger.info(f"      Path: {sub_route.path}")  # This path is relative to the router's prefix
-                    logger.info(f"      Full Path (estimated): {getattr(route, 'prefix', '')}{sub_route.path}")
-                    logger.info(f"      Methods: {getattr(sub_route, 'methods', 'N/A')}")
-                    if hasattr(sub_route, "endpoint"):
-                        endpoint = (
-                            sub_route.endpoint.__name__
-                            if hasattr(sub_route.endpoint, "__name__")
-                            else sub_route.endpoint
-                        )
-                        logger.info(f"      Endpoint: {endpoint}")
+                sub_path = getattr(sub_route, "path", None)
+                if sub_path is None:
+                    continue
+                lines.append(f"    Sub-route #{sub_route_idx}:")
+                lines.append(f"      Name: {getattr(sub_route, 'name', 'N/A')}")
+                lines.append(f"      Path: {sub_path}")  # This path is relative to the router's prefix
+                lines.append(f"      Full Path (estimated): {getattr(route, 'prefix', '')}{sub_path}")
+                lines.append(f"      Methods: {getattr(sub_route, 'methods', 'N/A')}")
+                if hasattr(sub_route, "endpoint"):
+                    lines.append(f"      Endpoint: {_endpoint_name(sub_route)}")
         else:
-            logger.info(f"  Unknown route type: {type(route)}")
-        logger.info("-" * 20)
+            lines.append(f"  Unknown route type: {type(route)}")
+        lines.append("-" * 20)
+        logger.info("\n".join(lines))
+
+
+async def _run_channel_hooks(hook_name: str, fastapi_app: "FastAPI"):
+    """
+    Run the `hook_name` hook ("on_startup" or "on_shutdown") of all channels concurrently.
+    A failing channel is logged and does not affect the others.
+    """
+    channels = list(getattr(fastapi_app.state, "channels", _registered_channels))
+    results = await asyncio.gather(
+        *(getattr(channel, hook_name)(fastapi_app) for channel in channels), return_exceptions=True
+    )
+    for channel, result in zip(channels, results):
+        if isinstance(result, BaseException):
+            logger.error("Error in %s of channel %s: %s", hook_name, channel.name, result, exc_info=result)
 
 
 @asynccontextmanager
-async def lifespan(fastapi_app: FastAPI):
+async def lifespan(fastapi_app: "FastAPI"):
     # Executed on startup
     _log_registered_routes(fastapi_app)
 
-    # Run startup tasks from channels
-    logger.info("Executing channel startup tasks...")
-    for channel in _registered_channels:
-        try:
-            startup_tasks = channel.get_startup_tasks()
-            for task_coro in startup_tasks:
-                logger.info(
-                    f"Creating startup task for {channel.name}: {getattr(task_coro, '__name__', 'unknown_task')}"
-                )
-                asyncio.create_task(task_coro())
-        except Exception as e:
-            logger.error(f"Error getting or running startup tasks for channel {channel.name}: {e}", exc_info=True)
-    logger.info("Channel startup tasks initiated.")
+    logger.info("Starting channels...")
+    await _run_channel_hooks("on_startup", fastapi_app)
+    logger.info("Channels started.")
 
     yield  # This is where the app runs
 
     # Executed on shutdown
     logger.info("Shutting down. Closing channels...")
-    for channel in _registered_channels:
-        try:
-            channel.close()
-            logger.info(f"Channel {channel.name} closed.")
-        except Exception as e:
-            logger.error(f"Error closing channel {channel.name}: {e}", exc_info=True)
+    await _run_channel_hooks("on_shutdown", fastapi_app)
     logger.info("All channels closed.")
 
 
-app = FastAPI(
-    title="Ultimate Chatbot Framework",
-    description=(
-        "An async chatbot framework with conversation persistence, event handling, and flexible channel routing."
-    ),
-    lifespan=lifespan,
-)
+def _create_app(app_config: AppConfig) -> "FastAPI":
+    from fastapi import FastAPI
+
+    # Webhook-only deployments rarely need the docs; disabling them skips the OpenAPI schema build.
+    openapi_enabled = app_config.openapi_enabled
+    return FastAPI(
+        title="Ultimate Chatbot Framework",
+        description=(
+            "An async chatbot framework with conversation persistence, event handling, and flexible channel routing."
+        ),
+        lifespan=lifespan,
+        openapi_url="/openapi.json" if openapi_enabled else None,
+        docs_url="/docs" if openapi_enabled else None,
+        redoc_url="/redoc" if openapi_enabled else None,
+    )
+
+
+def __getattr__(name: str):
+    """
+    Build the FastAPI app on first access (e.g. when uvicorn imports `botbase.botapi:app`).
+    Interactive mode never touches `app`, so it never pays for importing FastAPI.
+    """
+    if name == "app":
+        fastapi_app = _get_app()
+        init()
+        return fastapi_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _get_app() -> "FastAPI":
+    """
+    Return the module-level app, creating it (without channels) if it doesn't exist yet.
+    Code inside this module must use this rather than the bare name, which the module-level
+    __getattr__ does not cover.
+    """
+    global app
+    fastapi_app = globals().get("app")
+    if fastapi_app is None:
+        fastapi_app = app = _create_app(config)
+    return fastapi_app
 
 
 def init():
     """
     Initialize the framework by loading configuration and user-defined modules.
+    Subsequent calls are no-ops, so middleware and channel routes are never registered twice.
+    """
+    global _initialized
+    if _initialized:
+        logger.debug("Framework already initialized, skipping.")
+        return
+    fastapi_app = _get_app()
+    _add_cors_middleware(fastapi_app)
+    _registered_channels.extend(_load_and_register_channels(fastapi_app, config.channels))
+    _initialized = True
+
+
+def create_app(app_config: Optional[AppConfig] = None) -> "FastAPI":
+    """
+    Build a standalone FastAPI app with the channels of `app_config` (the loaded config by default).
+    Unlike the module-level `app`, every call returns a new app with its own channel instances,
+    available as `app.state.channels` and started/closed by the app's lifespan.
+    """
+    app_config = app_config or config
+    fastapi_app = _create_app(app_config)
+    _add_cors_middleware(fastapi_app)
+    fastapi_app.state.channels = _load_and_register_channels(fastapi_app, app_config.channels)
+    return fastapi_app
+
+
+def reinit_channels():
     """
-    _add_cors_middleware()
-    _load_and_register_channels()
+    Load the channels again from the current config (see `botbase.config.set_config`) and register
+    their routes on `app`, without reloading any module. Routes of the previously registered channels
+    are not removed, so tests should assign a fresh `app` first.
+    """
+    global _initialized
+    _registered_channels.clear()
+    _registered_channels.extend(_load_and_register_channels(_get_app(), config.channels))
+    _initialized = True
+
 
+def _add_cors_middleware(fastapi_app: "FastAPI"):
+    from fastapi.middleware.cors import CORSMiddleware
 
-def _add_cors_middleware():
-    app.add_middleware(
+    fastapi_app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
@@ -107,84 +186,131 @@ def _add_cors_middleware():
     )
 
 
-def _load_and_register_channels():
-    for chan_cfg in config.channels:
+def _load_and_register_channels(fastapi_app: "FastAPI", channel_configs: List[ChannelConfig]) -> List["BaseChannel"]:
+    """Instantiate the configured channels and register their routes on `fastapi_app`."""
+    # Resolve all channel classes first, so registration is a tight loop over ready-made entries.
+    plan = []
+    for chan_cfg in channel_configs:
         ChannelClass = _get_channel_class(chan_cfg.type)
-        if not ChannelClass:
-            continue
+        if ChannelClass:
+            plan.append((ChannelClass, chan_cfg))
 
+    channels = []
+    for ChannelClass, chan_cfg in plan:
         channel_instance = _instantiate_channel(ChannelClass, chan_cfg)
         if not channel_instance:
             continue
 
-        channel_instance.register_routes(app)
-        _registered_channels.append(channel_instance)
-        logger.info(f"Channel {chan_cfg.name}:{chan_cfg.type} registered and added to active list")
+        channel_instance.register_routes(fastapi_app)
+        channels.append(channel_instance)
+        logger.info("Channel %s:%s registered and added to active list", chan_cfg.name, chan_cfg.type)
+    return channels
 
 
-def _get_channel_class(channel_type: str) -> type[BaseChannel]:
-    if "." in channel_type:
-        return _get_custom_channel_class(channel_type)
-    else:
-        return _get_builtin_channel_class(channel_type)
-
-
-def _get_custom_channel_class(channel_type: str) -> type[BaseChannel]:
-    module_path, class_name = channel_type.rsplit(".", 1)
-    try:
-        mod = import_module(module_path)
-        return getattr(mod, class_name)
-    except (ImportError, AttributeError) as e:
-        logger.error(f"Error loading custom channel '{channel_type}': {e}")
-        return None
+@functools.lru_cache(maxsize=None)
+def _cached_import(module_name: str, attr_name: str):
+    """
+    Import `module_name` (if not already imported) and return its `attr_name` attribute.
+    Channels of the same type share one lookup instead of re-entering the import machinery.
+    """
+    modules = sys.modules
+    if module_name not in modules:
+        import_module(module_name)
+    return getattr(modules[module_name], attr_name)
 
 
-def _get_builtin_channel_class(channel_type: str) -> type[BaseChannel]:
+def _get_channel_class(channel_type: str) -> "type[BaseChannel]":
+    """
+    Resolve a channel class from its configured type.
+    Dotted types ("package.module.ClassName") are custom channels; plain types ("webhook")
+    map to `botbase.channels.<type>.<Type>Channel`.
+    """
+    module_path, sep, class_name = channel_type.rpartition(".")
+    if sep:
+        kind, module_name, attr_name = "custom", module_path, class_name
+    else:
+        kind, module_name, attr_name = (
+            "built-in",
+            f"botbase.channels.{channel_type}",
+            f"{channel_type.capitalize()}Channel",
+        )
     try:
-        module_name = f"botbase.channels.{channel_type}"
-        mod = import_module(module_name)
-        return getattr(mod, f"{channel_type.capitalize()}Channel")
+        return _cached_import(module_name, attr_name)
     except (ImportError, AttributeError) as e:
-        logger.error(f"Error loading built-in channel '{channel_type}': {e}")
+        logger.error("Error loading %s channel '%s': %s", kind, channel_type, e)
         return None
 
 
-def _instantiate_channel(ChannelClass: type[BaseChannel], chan_cfg: ChannelConfig) -> BaseChannel:
+def _instantiate_channel(ChannelClass: "type[BaseChannel]", chan_cfg: ChannelConfig) -> "BaseChannel":
     kwargs = chan_cfg.arguments
     try:
         return ChannelClass(name=chan_cfg.name, **kwargs)
     except Exception as e:
-        logger.error(f"Error instantiating channel '{chan_cfg.name}' with params {kwargs}: {e}")
+        logger.error("Error instantiating channel '%s' with params %s: %s", chan_cfg.name, kwargs, e)
         return None
 
 
-def runserver(**uvicorn_kwargs):
+_USAGE = """\
+usage: [-h] [--interactive] [--conv-id ID]
+
+Run the bot in interactive or server mode
+
+options:
+  -h, --help        Show this help message and exit.
+  --interactive     Run in interactive terminal mode.
+  --conv-id ID      Conversation ID for interactive mode. If not provided, a UUID will be generated.
+"""
+
+
+def _parse_cli_args(argv: List[str]) -> Tuple[bool, Optional[str], List[str]]:
     """
-    Run the server using Uvicorn with the provided keyword arguments.
-    Handles CLI arguments for both interactive and server modes.
+    Extract `--interactive` and `--conv-id <id>` (or `--conv-id=<id>`) from argv.
+    `-h`/`--help` prints the usage and exits.
+    Returns (interactive, conv_id, remaining_argv). A plain scan is enough for two
+    options and avoids importing argparse on every start.
     """
-    import argparse
+    interactive = False
+    conv_id = None
+    remaining = []
+    args = iter(argv)
+    for arg in args:
+        if arg in ("-h", "--help"):
+            print(_USAGE, end="")
+            raise SystemExit(0)
+        elif arg == "--interactive":
+            interactive = True
+        elif arg == "--conv-id":
+            conv_id = next(args, None)
+            if conv_id is None:
+                raise SystemExit("error: argument --conv-id: expected one argument")
+        elif arg.startswith("--conv-id="):
+            conv_id = arg.partition("=")[2]
+        else:
+            remaining.append(arg)
+    return interactive, conv_id, remaining
 
-    parser = argparse.ArgumentParser(description="Run the bot in interactive or server mode")
-    parser.add_argument("--interactive", action="store_true", help="Run in interactive terminal mode")
-    parser.add_argument(
-        "--conv-id",
-        type=str,
-        default=None,
-        help="Specify a conversation ID for interactive mode. If not provided, a UUID will be generated.",
-    )
 
-    # Parse only known args to allow additional uvicorn args
-    args, remaining_argv = parser.parse_known_args()
+def runserver(argv: Optional[List[str]] = None, **uvicorn_kwargs):
+    """
+    Run the server using Uvicorn with the provided keyword arguments.
+    Handles CLI arguments (`argv`, defaulting to sys.argv[1:]) for both interactive and server modes:
 
-    # Update sys.argv to only contain unparsed args
-    sys.argv[1:] = remaining_argv
+    -h, --help        Show the usage and exit.
+    --interactive     Run in interactive terminal mode.
+    --conv-id ID      Conversation ID for interactive mode. If not provided, a UUID will be generated.
+    """
+    if argv is None:
+        interactive, conv_id, remaining_argv = _parse_cli_args(sys.argv[1:])
+        # Update sys.argv to only contain unparsed args
+        sys.argv[1:] = remaining_argv
+    else:
+        interactive, conv_id, _ = _parse_cli_args(argv)
 
-    if args.interactive:
+    if interactive:
         logger.info("Starting interactive terminal channel")
         from botbase.channels.interactive import run_interactive
 
-        run_interactive(conv_id=args.conv_id)
+        run_interactive(conv_id=conv_id)
         return
 
     # Otherwise, start the web server
@@ -193,8 +319,6 @@ def runserver(**uvicorn_kwargs):
     logger.info("Running Uvicorn server...")
     # Disable Uvicorn's default logging configuration so our logs are used
     uvicorn_kwargs.setdefault("log_config", None)
+    # uvicorn's default loop="auto" already runs on uvloop whenever it is installed.
 
     uvicorn.run("botbase.botapi:app", **uvicorn_kwargs)
-
-
-init()
@@ -1,12 +1,60 @@
+import asyncio
+import logging
 from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
 
+import aiohttp
 from fastapi import APIRouter, BackgroundTasks, Request
+from fastapi.responses import ORJSONResponse
+
+from botbase.events import handle_event
+from botbase.tracker.base import ConversationTracker
+
+logger = logging.getLogger(__name__)
+
+JSON_HEADERS = {"Content-Type": "application/json"}  # For requests whose body is already serialized with orjson.
 
 
 class BaseChannel(ABC):
     def __init__(self, name: str):
         self.name = name
-        self.router = APIRouter(prefix=f"/channels/{self.name}")
+        # orjson serializes channel responses considerably faster than the stdlib json encoder.
+        self.router = APIRouter(prefix=f"/channels/{self.name}", default_response_class=ORJSONResponse)
+        # Shared HTTP session for outgoing requests, created on first use; see _get_session().
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._closed = False
+
+    def _session_kwargs(self) -> Dict[str, Any]:
+        """
+        Keyword arguments for the shared aiohttp session.
+        Override to tune the connector pool or timeouts for the remote API.
+        """
+        return {"connector": aiohttp.TCPConnector(limit=64, keepalive_timeout=75)}
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Return the shared aiohttp session, creating it on first use.
+        It must be created from within the running event loop, hence not in __init__.
+        Raises RuntimeError once the session was closed by _close_session().
+        """
+        if self._closed:
+            raise RuntimeError(f"{type(self).__name__} {self.name} is closed")
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(**self._session_kwargs())
+        return self._session
+
+    async def _close_session(self):
+        """
+        Close the shared session for good; call it last in close().
+        """
+        self._closed = True
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _handle_and_persist(self, tracker: ConversationTracker):
+        """Run the handlers, then store the whole turn (user and bot events) in one persist call."""
+        await handle_event(tracker)
+        await tracker.persist()
 
     @abstractmethod
     def register_routes(self, app):
@@ -25,7 +73,9 @@ class BaseChannel(ABC):
     @abstractmethod
     def close(self):
         """
-        Close the channel (e.g., flush pending messages). Non-blocking.
+        Close the channel (e.g., flush pending messages, release HTTP sessions).
+        Called once at application shutdown, never per request; implementations must be idempotent.
+        May be implemented as a coroutine function; it is awaited on shutdown.
         """
         pass
 
@@ -35,3 +85,21 @@ class BaseChannel(ABC):
         These tasks will be executed by asyncio.create_task().
         """
         return []
+
+    async def on_startup(self, app):
+        """
+        Called from the app lifespan at startup, concurrently for all channels.
+        By default, schedules the coroutines returned by get_startup_tasks() as background tasks.
+        """
+        for task_coro in self.get_startup_tasks():
+            logger.info("Creating startup task for %s: %s", self.name, getattr(task_coro, "__name__", "unknown_task"))
+            asyncio.create_task(task_coro())
+
+    async def on_shutdown(self, app):
+        """
+        Called from the app lifespan at shutdown, concurrently for all channels.
+        By default, closes the channel.
+        """
+        result = self.close()
+        if asyncio.iscoroutine(result):
+            await result
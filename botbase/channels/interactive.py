@@ -1,16 +1,16 @@
 import asyncio
-import datetime
+import functools
 import logging
+import sys
 import uuid
 from enum import Enum
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-from prompt_toolkit import HTML, PromptSession, print_formatted_text
-from prompt_toolkit.styles import Style
+from botbase.tracker.base import BOT_EVENT_TYPE, USER_EVENT_TYPE, Event
 
-from botbase.events import handle_event
-from botbase.tracker.base import Event
-from botbase.tracker.factory import create_tracker
+if TYPE_CHECKING:
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.styles import Style
 
 logger = logging.getLogger(__name__)
 
@@ -23,14 +23,40 @@ class CommandType(Enum):
     QUIT = "quit"
 
 
-prompt_style = Style.from_dict(
-    {
-        "prompt": "#ffff00 bold",
-        "bot": "#00ff00 bold",
-        "": "#ffff00 bold",
-        "system": "#ff00ff bold",
-    }
-)
+# Resolved once so the per-input checks avoid Enum attribute lookups.
+_EXIT_COMMANDS = frozenset({CommandType.EXIT.value, CommandType.QUIT.value})
+_RESTART_COMMAND = CommandType.RESTART.value
+
+
+@functools.cache
+def _get_style() -> "Style":
+    """
+    Build the prompt_toolkit style on first use.
+    prompt_toolkit is imported lazily so that importing this module stays cheap.
+    """
+    from prompt_toolkit.styles import Style
+
+    return Style.from_dict(
+        {
+            "prompt": "#ffff00 bold",
+            "bot": "#00ff00 bold",
+            "": "#ffff00 bold",
+            "system": "#ff00ff bold",
+        }
+    )
+
+
+# Pre-built (style, text) fragments, so no prompt_toolkit HTML markup is parsed at runtime.
+_PROMPT_MESSAGE = [("class:prompt", "You:"), ("", " ")]
+_WELCOME_MESSAGE = [
+    ("class:system", "Interactive Terminal Chatbot.\nCommands: "),
+    ("class:system bold", "exit"),
+    ("class:system", "/"),
+    ("class:system bold", "quit"),
+    ("class:system", " to stop, "),
+    ("class:system bold", "/restart"),
+    ("class:system", " for new conversation."),
+]
 
 
 class InteractiveChannel:
@@ -43,22 +69,42 @@ class InteractiveChannel:
         self.session = self._create_prompt_session()
         self.conv_id = conv_id
         self.tracker = None
+        # Latest background persist; each one waits for the previous, so awaiting this flushes all.
+        self._persist_task: Optional[asyncio.Task] = None
+
+    def _create_prompt_session(self) -> Optional["PromptSession"]:
+        """
+        Create the prompt_toolkit session, or return None when stdin is not a terminal
+        (piped input, scripted runs), in which case input is read with plain input().
+        """
+        if not sys.stdin.isatty():
+            return None
+
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.formatted_text import FormattedText
 
-    def _create_prompt_session(self) -> PromptSession:
         return PromptSession(
-            HTML("<prompt>You:</prompt> "),
-            style=prompt_style,
+            FormattedText(_PROMPT_MESSAGE),
+            style=_get_style(),
             input_processors=[],
             style_transformation=None,
             color_depth="DEPTH_24_BIT",
         )
 
+    async def _read_input(self) -> str:
+        if self.session is None:
+            return await asyncio.to_thread(input, "You: ")
+        return await self.session.prompt_async()
+
     async def _initialize_conversation(self, conv_id: Optional[str] = None) -> None:
+        # Imported here so importing this module doesn't load the configured tracker backend.
+        from botbase.tracker.factory import create_tracker
+
         if conv_id is None:
             conv_id = str(uuid.uuid4())
-            logger.info(f"Generated new conversation ID: {conv_id}")
+            logger.info("Generated new conversation ID: %s", conv_id)
         self.tracker = await create_tracker(conv_id)
-        logger.info(f"Initialized interactive channel with conversation ID: {conv_id}")
+        logger.info("Initialized interactive channel with conversation ID: %s", conv_id)
         self.tracker.register_callback(self.on_bot_event)
 
     async def _handle_restart(self) -> None:
@@ -69,57 +115,86 @@ class InteractiveChannel:
         self._print_styled(f"Started new conversation with ID: {new_conv_id}", "system")
 
     def _print_styled(self, text: str, style_class: str = "prompt") -> None:
-        print_formatted_text(HTML(f"<{style_class}>{text}</{style_class}>"), style=prompt_style)
+        # A plain (style, text) fragment skips prompt_toolkit's HTML parser, and "<" or "&"
+        # in bot replies is printed as-is instead of breaking the markup.
+        self._print_fragments([(f"class:{style_class}", text)])
+
+    def _print_fragments(self, fragments) -> None:
+        if self.session is None:
+            # Not a terminal: print plain text so piped runs never import prompt_toolkit.
+            print("".join(text for _, text in fragments))
+            return
+        from prompt_toolkit import print_formatted_text
+        from prompt_toolkit.formatted_text import FormattedText
+
+        print_formatted_text(FormattedText(fragments), style=_get_style())
 
     async def _process_user_input(self, user_input: str) -> bool:
         user_input = user_input.strip()
-        if user_input.lower() in (CommandType.EXIT.value, CommandType.QUIT.value):
+        if user_input.lower() in _EXIT_COMMANDS:
             self._print_styled("Exiting...")
             return False
-        elif user_input == CommandType.RESTART.value:
+        elif user_input == _RESTART_COMMAND:
             await self._handle_restart()  # Now properly awaits the restart
             return True
 
-        user_event = Event(
-            type="user",
-            text=user_input,
-            payload={},
-            created_at=datetime.datetime.utcnow(),
-        )
+        user_event = Event(type=USER_EVENT_TYPE, text=user_input, payload={})
         self.tracker.add_event(user_event)
+        from botbase.events import handle_event
+
         try:
             await handle_event(self.tracker)
-            await self.tracker.persist()
         except Exception as e:
             self._print_styled(f"Error processing event: {e}")
-            logger.error(f"Error processing event: {e}", exc_info=True)
+            logger.error("Error processing event: %s", e, exc_info=True)
+        else:
+            # Persist in the background so the next prompt is not delayed by storage I/O.
+            self._persist_task = asyncio.create_task(self._persist(self.tracker, self._persist_task))
         return True
 
+    async def _persist(self, tracker, previous: Optional[asyncio.Task]) -> None:
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await tracker.persist()
+        except Exception as e:
+            self._print_styled(f"Error persisting conversation: {e}")
+            logger.error("Error persisting conversation %s: %s", tracker.conv_id, e, exc_info=True)
+
+    async def _wait_for_persist(self) -> None:
+        if self._persist_task is not None:
+            await asyncio.wait([self._persist_task])
+
     async def on_bot_event(self, event: Event) -> None:
-        if event.type == "bot":
+        if event.type == BOT_EVENT_TYPE:
             self._print_styled(f"Bot: {event.text}", "bot")
 
     async def run(self) -> None:
-        welcome_msg = (
-            "Interactive Terminal Chatbot.\n"
-            "Commands: <b>exit</b>/<b>quit</b> to stop, <b>/restart</b> for new conversation."
-        )
-        self._print_styled(welcome_msg, "system")
+        self._print_fragments(_WELCOME_MESSAGE)
         await self._initialize_conversation(self.conv_id)
-        while True:
-            try:
-                user_input = await self.session.prompt_async()
-                should_continue = await self._process_user_input(user_input)
-                if not should_continue:
+        try:
+            while True:
+                try:
+                    user_input = await self._read_input()
+                    should_continue = await self._process_user_input(user_input)
+                    if not should_continue:
+                        break
+                except (EOFError, KeyboardInterrupt):
+                    self._print_styled("\nExiting...", "system")
                     break
-            except (EOFError, KeyboardInterrupt):
-                self._print_styled("\nExiting...", "system")
-                break
+        finally:
+            await self._wait_for_persist()
 
 
 def run_interactive(conv_id: Optional[str] = None):
     channel = InteractiveChannel(conv_id=conv_id)
-    asyncio.run(channel.run())
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(channel.run())
+    else:
+        # uvloop (installed everywhere but Windows) replaces the pure-Python selector event loop.
+        uvloop.run(channel.run())
 
 
 if __name__ == "__main__":
@@ -1,18 +1,29 @@
 import asyncio
-import datetime
+import functools
 import logging
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from typing import List, Optional, Tuple
 
 import aiohttp
+import orjson
 from fastapi import APIRouter
 from md2tgmd import escape
 
-from botbase.channels.base import BaseChannel
-from botbase.events import handle_event
-from botbase.tracker.base import Event
+from botbase.channels.base import JSON_HEADERS, BaseChannel
+from botbase.tracker.base import BOT_EVENT_TYPE, USER_EVENT_TYPE, Event
 from botbase.tracker.factory import create_tracker
 
 logger = logging.getLogger(__name__)
 
+_LONG_POLL_TIMEOUT = 50  # Seconds Telegram holds a getUpdates request open while waiting for updates.
+_MAX_POLL_BACKOFF = 30  # Upper bound, in seconds, for the retry delay after polling errors.
+_MAX_SEEN_UPDATES = 2048  # How many recent update IDs are remembered to drop re-delivered updates.
+_OUTBOX_WORKERS = 4  # Sender tasks draining outgoing replies; each chat always maps to the same one.
+_OUTBOX_SIZE = 256  # Pending replies per sender before on_bot_event waits.
+_OUTBOX_FLUSH_TIMEOUT = 5  # Seconds close() waits for in-flight updates, and then for queued replies.
+
 
 class TelegramChannel(BaseChannel):
     """
@@ -20,44 +31,100 @@ class TelegramChannel(BaseChannel):
     Instead of receiving webhooks, it polls Telegram's getUpdates endpoint and processes messages.
     """
 
-    def __init__(self, name: str, token: str, message_age_threshold: int = None, **kwargs):
+    def __init__(
+        self, name: str, token: str, message_age_threshold: int = None, max_concurrent_updates: int = 16, **kwargs
+    ):
         super().__init__(name)
         self.router = APIRouter()  # No HTTP routes needed for polling.
         self.token = token
         self.base_url = f"https://api.telegram.org/bot{self.token}"
         self.offset = 0  # Telegram API requires an offset to avoid duplicate messages.
         self.message_age_threshold = message_age_threshold
-        logger.info(f"TelegramChannel initialized with token ending with ...{self.token[-4:]}")
+        self.max_concurrent_updates = max_concurrent_updates
+        logger.info("TelegramChannel initialized with token ending with ...%s", self.token[-4:])
         self._polling_task = None
+        # Recently processed update IDs, oldest first; Telegram may re-deliver updates while handlers are slow.
+        self._seen_update_ids: "OrderedDict[int, None]" = OrderedDict()
+        # Bounds the number of updates handled at once; created in poll_updates, inside the running loop.
+        self._update_slots: Optional[asyncio.Semaphore] = None
+        self._update_tasks = set()
+        # Outgoing replies, sharded by chat so each chat's messages stay in order; created at startup.
+        self._outboxes: List["asyncio.Queue[Tuple[int, str]]"] = []
+        self._sender_tasks: List[asyncio.Task] = []
+
+    def _session_kwargs(self):
+        # Polling and replies share the session, so they reuse keep-alive connections to the Bot API.
+        connector = aiohttp.TCPConnector(limit=100, keepalive_timeout=75, ttl_dns_cache=300)
+        return {"connector": connector, "timeout": aiohttp.ClientTimeout(total=30)}
 
     def register_routes(self, app):
         """
         Instead of registering HTTP routes, we register a startup event that launches the long-polling loop.
         """
 
-        # Startup event is now handled by get_startup_tasks and botapi.py lifespan
+        # Polling is started from on_startup, called by the botapi lifespan.
         logger.info("TelegramChannel: Routes registered. Polling will be initiated by botapi lifespan.")
 
     async def poll_updates(self):
         """
         Continuously poll Telegram for new updates.
-        Uses a timeout of 10 seconds and sleeps briefly between polling cycles.
+        Relies on Telegram's long polling to wait for updates, and only backs off (exponentially) after errors.
         """
-        async with aiohttp.ClientSession() as session:
+        session = await self._get_session()
+        self._update_slots = asyncio.Semaphore(self.max_concurrent_updates)
+        # The socket read must outlive Telegram's long-poll window.
+        request_timeout = aiohttp.ClientTimeout(total=_LONG_POLL_TIMEOUT + 10)
+        backoff = 0
+        try:
             while True:
                 try:
-                    params = {"offset": self.offset, "timeout": 10}
-                    async with session.get(f"{self.base_url}/getUpdates", params=params) as resp:
-                        data = await resp.json()
-                        for update in data.get("result", []):
-                            self.offset = update["update_id"] + 1
-                            logger.info(f"TelegramChannel: Received update: {update}")
-                            if "message" in update:
-                                asyncio.create_task(self.process_update(update))
+                    params = {"offset": self.offset, "timeout": _LONG_POLL_TIMEOUT, "limit": 100}
+                    async with session.get(
+                        f"{self.base_url}/getUpdates", params=params, timeout=request_timeout
+                    ) as resp:
+                        data = orjson.loads(await resp.read())
+                    if not data.get("ok"):
+                        # E.g. 401 for a bad token, 409 when another poller or a webhook is active, 429 when
+                        # rate limited. Retrying right away would hammer the API, so back off like on errors.
+                        logger.error(
+                            "TelegramChannel: getUpdates failed (%s): %s",
+                            data.get("error_code"),
+                            data.get("description"),
+                        )
+                        backoff = min(backoff * 2 or 1, _MAX_POLL_BACKOFF)
+                        retry_after = (data.get("parameters") or {}).get("retry_after") or 0
+                        await asyncio.sleep(max(backoff, retry_after))
+                        continue
+                    for update in data.get("result", []):
+                        self.offset = update["update_id"] + 1
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("TelegramChannel: Received update: %s", update)
+                        if "message" in update:
+                            await self._dispatch_update(update)
+                    backoff = 0
                 except Exception as e:
-                    logger.error(f"TelegramChannel: Error during polling: {e}", exc_info=True)
-                await asyncio.sleep(1)  # Pause before next poll to avoid hitting rate limits.
-            logger.info("TelegramChannel: Polling loop ended.")  # Should not happen in normal operation
+                    logger.error("TelegramChannel: Error during polling: %s", e, exc_info=True)
+                    backoff = min(backoff * 2 or 1, _MAX_POLL_BACKOFF)
+                    await asyncio.sleep(backoff)
+        except asyncio.CancelledError:
+            logger.info("TelegramChannel: Polling loop cancelled.")
+            raise
+
+    async def _dispatch_update(self, update: dict):
+        """
+        Handle an update in a background task, waiting first if `max_concurrent_updates` are already in flight.
+        Waiting here holds back the poll loop, so bursts queue up at Telegram rather than as pending tasks.
+        """
+        slots = self._update_slots
+        await slots.acquire()
+        task = asyncio.create_task(self.process_update(update))
+        self._update_tasks.add(task)
+
+        def _on_done(finished):
+            self._update_tasks.discard(finished)
+            slots.release()
+
+        task.add_done_callback(_on_done)
 
     async def process_update(self, update: dict):
         """
@@ -66,16 +133,27 @@ class TelegramChannel(BaseChannel):
         - Creates a user event.
         - Registers a callback to send bot replies.
         - Triggers BotBase event handlers.
+        Updates that were already processed (re-delivered by Telegram) are skipped.
         """
+        update_id = update.get("update_id")
+        if update_id is not None:
+            seen = self._seen_update_ids
+            if update_id in seen:
+                logger.debug("TelegramChannel: Skipping duplicate update %s", update_id)
+                return
+            seen[update_id] = None
+            if len(seen) > _MAX_SEEN_UPDATES:
+                seen.popitem(last=False)
+
         message = update.get("message")
         if not message:
             return
 
         if self.message_age_threshold is not None and "date" in message:
-            message_age = datetime.datetime.now().timestamp() - message["date"]
+            message_age = time.time() - message["date"]
             if message_age > self.message_age_threshold:
                 logger.info(
-                    f"Skipping message from {message_age:.1f} seconds ago (threshold: {self.message_age_threshold}s)"
+                    "Skipping message from %.1f seconds ago (threshold: %ss)", message_age, self.message_age_threshold
                 )
                 return
 
@@ -88,40 +166,55 @@ class TelegramChannel(BaseChannel):
         if not text:
             return
 
-        logger.info(f"TelegramChannel: Received message from chat {chat_id}: {text}")
+        logger.info("TelegramChannel: Received message from chat %s: %s", chat_id, text)
 
         # Use the Telegram chat ID as the conversation ID.
         tracker = await create_tracker(str(chat_id))
 
         # Register a callback to handle bot responses.
-        tracker.register_callback(lambda event: self.on_bot_event(event, chat_id))
+        tracker.register_callback(functools.partial(self.on_bot_event, chat_id=chat_id))
 
         # Create and add a user event.
         user_event = Event(
-            type="user",
+            type=USER_EVENT_TYPE,
             text=text,
             payload={**update, "_channel": self.name},
-            created_at=datetime.datetime.now(datetime.timezone.utc),
         )
         tracker.add_event(user_event)
 
         # Process event via BotBase handlers and persist conversation state.
-        await handle_event(tracker)
-        await tracker.persist()
+        await self._handle_and_persist(tracker)
 
     async def on_bot_event(self, event: Event, chat_id: int):
         """
         Callback function that gets triggered whenever a bot event occurs.
         Sends the bot's reply to the corresponding Telegram chat.
         """
-        if event.type == "bot" and event.text:
-            await self.send_message(chat_id, event.text)
+        if event.type == BOT_EVENT_TYPE and event.text:
+            if self._outboxes:
+                await self._outboxes[hash(chat_id) % len(self._outboxes)].put((chat_id, event.text))
+            else:  # Senders not started (e.g. process_update called outside the app lifespan)
+                await self.send_message(chat_id, event.text)
+
+    async def _sender(self, outbox: "asyncio.Queue[Tuple[int, str]]"):
+        """
+        Send queued replies one by one, so a slow sendMessage never blocks the callback that queued it.
+        """
+        while True:
+            chat_id, text = await outbox.get()
+            try:
+                await self.send_message(chat_id, text)
+            except Exception as e:
+                logger.error("TelegramChannel: Error sending message to chat %s: %s", chat_id, e, exc_info=True)
+            finally:
+                outbox.task_done()
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def adapt_markdown(text: str) -> str:
         """
         Converts markdown text to Telegram's MarkdownV2 format.
-        Uses md2tgmd for reliable conversion.
+        Uses md2tgmd for reliable conversion. Results are cached, as bots often repeat the same replies.
 
         Args:
             text: Text with markdown formatting
@@ -142,15 +235,17 @@ class TelegramChannel(BaseChannel):
         """
         telegram_text = self.adapt_markdown(text)
 
-        async with aiohttp.ClientSession() as session:
-            payload = {"chat_id": chat_id, "text": telegram_text, "parse_mode": "MarkdownV2"}
-            async with session.post(f"{self.base_url}/sendMessage", json=payload) as resp:
-                result = await resp.json()
-                if not result.get("ok"):
-                    logger.error(f"TelegramChannel: Failed to send message to chat {chat_id}: {result}")
-                    logger.debug(f"Original markdown: {text}")
-                    logger.debug(f"Telegram MarkdownV2: {telegram_text}")
-                return result
+        session = await self._get_session()
+        payload = {"chat_id": chat_id, "text": telegram_text, "parse_mode": "MarkdownV2"}
+        async with session.post(
+            f"{self.base_url}/sendMessage", data=orjson.dumps(payload), headers=JSON_HEADERS
+        ) as resp:
+            result = orjson.loads(await resp.read())
+            if not result.get("ok"):
+                logger.error("TelegramChannel: Failed to send message to chat %s: %s", chat_id, result)
+                logger.debug("Original markdown: %s", text)
+                logger.debug("Telegram MarkdownV2: %s", telegram_text)
+            return result
 
     async def process_request(self, request, background_tasks):
         """
@@ -162,21 +257,47 @@ class TelegramChannel(BaseChannel):
         logger.info("TelegramChannel: Starting long polling for Telegram updates via start_polling_task")
         # Create the task, but also store a reference if we need to manage it (e.g., cancel on shutdown)
         self._polling_task = asyncio.create_task(self.poll_updates())
+        self._outboxes = [asyncio.Queue(maxsize=_OUTBOX_SIZE) for _ in range(_OUTBOX_WORKERS)]
+        self._sender_tasks = [asyncio.create_task(self._sender(outbox)) for outbox in self._outboxes]
 
-    def get_startup_tasks(self):
+    async def on_startup(self, app):
         """
-        Return the polling task to be run at application startup.
+        Start polling and the reply senders at application startup.
         """
-        return [self.start_polling_task]
+        await self.start_polling_task()
 
-    def close(self):
+    async def close(self):
         """
-        Any necessary cleanup can be implemented here.
-        Attempt to cancel the polling task if it's running.
+        Cancel the polling task if it's running, let in-flight updates finish, flush queued replies
+        and close the shared HTTP session. The channel cannot send anything afterwards.
         """
         if self._polling_task and not self._polling_task.done():
             logger.info("TelegramChannel: Attempting to cancel polling task.")
             self._polling_task.cancel()
+            # Wait for the in-flight getUpdates request to be torn down before closing the session.
+            with suppress(asyncio.CancelledError):
+                await self._polling_task
         else:
             logger.info("TelegramChannel: No active polling task to cancel or task already done.")
-        pass
+        if self._update_tasks:
+            # Handlers still running would otherwise reply after the senders and the session are gone.
+            _, pending = await asyncio.wait(set(self._update_tasks), timeout=_OUTBOX_FLUSH_TIMEOUT)
+            if pending:
+                logger.warning("TelegramChannel: Cancelling %s unfinished updates", len(pending))
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        if self._outboxes:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(outbox.join() for outbox in self._outboxes)), _OUTBOX_FLUSH_TIMEOUT
+                )
+            except asyncio.TimeoutError:
+                logger.warning("TelegramChannel: Dropping unsent replies after %ss", _OUTBOX_FLUSH_TIMEOUT)
+            self._outboxes = []
+        for task in self._sender_tasks:
+            task.cancel()
+        await asyncio.gather(*self._sender_tasks, return_exceptions=True)
+        self._sender_tasks = []
+        await self._close_session()
+        self.adapt_markdown.cache_clear()
@@ -1,14 +1,13 @@
-import datetime
+import functools
 import logging
 from typing import Optional
 
-import aiohttp
+import orjson
 from fastapi import BackgroundTasks, Depends, FastAPI, Request
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
-from botbase.channels.base import BaseChannel
-from botbase.events import handle_event
-from botbase.tracker.base import ConversationTracker, Event
+from botbase.channels.base import JSON_HEADERS, BaseChannel
+from botbase.tracker.base import BOT_EVENT_TYPE, USER_EVENT_TYPE, ConversationTracker, Event
 from botbase.tracker.factory import create_tracker
 
 logger = logging.getLogger(__name__)
@@ -53,8 +52,8 @@ class WebhookChannel(BaseChannel):
         tracker = await create_tracker(conv_id)
 
         # Register a callback for this tracker that dispatches bot events immediately.
-        # We use a lambda to capture the current tracker.
-        tracker.register_callback(lambda event: self.on_tracker_event(event, tracker))
+        # A partial binds the current tracker.
+        tracker.register_callback(functools.partial(self.on_tracker_event, tracker=tracker))
 
         # Warn if data has 'channel' field.
         if "_channel" in data:
@@ -62,25 +61,22 @@ class WebhookChannel(BaseChannel):
 
         # Create and add a user event.
         user_event = Event(
-            type="user",
+            type=USER_EVENT_TYPE,
             text=text,
-            created_at=datetime.datetime.now(datetime.timezone.utc),
             payload={**data, "_channel": self.name},
         )
         tracker.add_event(user_event)
         logger.debug("User event added to tracker")
 
-        # Schedule other background tasks (e.g. event handling and persistence).
-        background_tasks.add_task(handle_event, tracker)
-        background_tasks.add_task(tracker.persist)
-        background_tasks.add_task(self.close)
+        # Handle the event and persist the turn in one background task.
+        background_tasks.add_task(self._handle_and_persist, tracker)
         logger.info("Scheduled background tasks for event handling, persistence, and dispatching bot events")
 
         return {"conv_id": tracker.conv_id, "status": "Message received."}
 
     async def on_tracker_event(self, event: Event, tracker: ConversationTracker):
         """Callback invoked for every new event. If the event is a bot message, dispatch it."""
-        if event.type == "bot":
+        if event.type == BOT_EVENT_TYPE:
             logger.info(f"New bot event detected for conversation {tracker.conv_id}: {event.text}")
             await self.dispatch_bot_event(event, tracker.conv_id)
 
@@ -99,16 +95,17 @@ class WebhookChannel(BaseChannel):
         }
         logger.info(f"Dispatching bot event to webhook {webhook_url}: {payload}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(webhook_url, json=payload) as resp:
-                    if resp.status == 200:
-                        logger.info(f"Successfully dispatched bot event: {event.text}")
-                    else:
-                        logger.error(f"Failed to dispatch bot event: {event.text}. HTTP status: {resp.status}")
+            session = await self._get_session()
+            # OPT_NON_STR_KEYS keeps parity with json.dumps for metadata dicts with non-string keys.
+            body = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+            async with session.post(webhook_url, data=body, headers=JSON_HEADERS) as resp:
+                if resp.status == 200:
+                    logger.info(f"Successfully dispatched bot event: {event.text}")
+                else:
+                    logger.error(f"Failed to dispatch bot event: {event.text}. HTTP status: {resp.status}")
         except Exception as e:
             logger.error(f"Exception dispatching bot event: {event.text}: {str(e)}", exc_info=True)
 
-    def close(self):
+    async def close(self):
         logger.debug("Closing webhook channel (flushing pending messages if any)")
-        # Implement any necessary cleanup; for now, we leave it empty.
-        pass
+        await self._close_session()
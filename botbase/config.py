@@ -1,33 +1,41 @@
+import functools
 import logging
 import os
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import yaml
 from pydantic import BaseModel, Field
 
+try:  # LibYAML bindings parse several times faster when available
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
 logger = logging.getLogger(__name__)
 
 # Regular expression to match ${VAR_NAME} patterns
 env_var_pattern = re.compile(r"\$\{([^}^{]+)\}")
 
 
+def _env_var_value(match: "re.Match") -> str:
+    # Unset variables are left as their bare name.
+    name = match.group(1)
+    return os.environ.get(name, name)
+
+
 def env_var_constructor(loader, node):
     """
     Extracts the environment variable from the node's value.
+    All ${VAR} references are substituted in a single pass, so substituted values are never re-scanned.
     """
     value = loader.construct_scalar(node)
-    match = env_var_pattern.findall(value)  # Find all env variables in the value
-    if match:
-        full_value = value
-        for g in match:
-            full_value = full_value.replace(f"${{{g}}}", os.environ.get(g, g))
-        return full_value
-    return value
+    return env_var_pattern.sub(_env_var_value, value)
 
 
-yaml.SafeLoader.add_implicit_resolver("!env_var", env_var_pattern, None)
-yaml.SafeLoader.add_constructor("!env_var", env_var_constructor)
+for _loader_cls in {yaml.SafeLoader, _Loader}:
+    _loader_cls.add_implicit_resolver("!env_var", env_var_pattern, None)
+    _loader_cls.add_constructor("!env_var", env_var_constructor)
 
 
 class PostgresConfig(BaseModel):
@@ -36,6 +44,7 @@ class PostgresConfig(BaseModel):
 
 class JSONLConfig(BaseModel):
     file_path: str = "./conversation_events.jsonl"
+    fsync: bool = False  # fsync after each persisted batch (survives power loss, costs one sync per batch)
 
 
 class SqliteTrackerConfig(BaseModel):
@@ -70,6 +79,7 @@ class AppConfig(BaseModel):
     jsonl: JSONLConfig = JSONLConfig()
     sqlite: SqliteTrackerConfig = SqliteTrackerConfig()
     channels: List[ChannelConfig] = Field(default_factory=list)
+    openapi_enabled: bool = True  # Serve /openapi.json, /docs and /redoc
 
 
 # Allow self-referencing models.
@@ -78,13 +88,47 @@ AppConfig.model_rebuild()
 
 def load_config():
     config_file = os.getenv("CONFIG_FILE", "config.yml")
-    if os.path.exists(config_file):
+    try:
+        mtime = os.stat(config_file).st_mtime_ns
+    except OSError:
+        mtime = None
+    return _load_config_file(config_file, mtime)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_config_file(config_file: str, mtime: Optional[int]) -> AppConfig:
+    """
+    Parse the config file at `config_file`; each path is read and validated only once per modification
+    time (`mtime` is None when the file does not exist).
+    """
+    if mtime is not None:
         logger.info(f"Loading configuration from {config_file}")
         with open(config_file, "r") as f:
-            data = yaml.safe_load(f) or {}
+            data = yaml.load(f, Loader=_Loader) or {}
         return AppConfig(**data)
     logger.warning(f"Config file {config_file} not found. Using default configuration.")
     return AppConfig()
 
 
-config = load_config()
+def _update_in_place(target: BaseModel, source: BaseModel):
+    for name in type(source).model_fields:
+        value = getattr(source, name)
+        current = getattr(target, name)
+        if isinstance(current, BaseModel) and type(current) is type(value):
+            _update_in_place(current, value)
+        else:
+            setattr(target, name, value)
+
+
+def set_config(new_config: AppConfig):
+    """
+    Replace the active configuration with `new_config`.
+    The shared `config` object (and its nested sections) is updated in place, so modules that imported
+    it see the new values without being reloaded; `create_tracker` switches backends when the tracker
+    type changes. Channels already registered keep their settings. Mainly meant for tests.
+    """
+    _update_in_place(config, new_config)
+
+
+# A copy of the cached parse, so set_config() never alters what load_config() returns.
+config = load_config().model_copy(deep=True)
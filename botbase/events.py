@@ -28,12 +28,16 @@ def handler():
 async def handle_event(tracker: ConversationTracker):
     """
     Shared entry point to process a conversation: runs all registered handlers concurrently.
+    With zero or one handler there is nothing to run concurrently, so gather() is skipped.
     """
-    logger.info(f"Processing event for conversation: {tracker.conv_id}")
-    tasks = [func(tracker) for func in _handler_registry]
+    logger.info("Processing event for conversation: %s", tracker.conv_id)
+    handlers = _handler_registry
     try:
-        await asyncio.gather(*tasks)
-        logger.info(f"Successfully processed event for conversation: {tracker.conv_id}")
+        if len(handlers) == 1:
+            await handlers[0](tracker)
+        elif handlers:
+            await asyncio.gather(*[func(tracker) for func in handlers])
+        logger.info("Successfully processed event for conversation: %s", tracker.conv_id)
     except Exception as e:
-        logger.error(f"Error processing event for conversation {tracker.conv_id}: {str(e)}", exc_info=True)
+        logger.error("Error processing event for conversation %s: %s", tracker.conv_id, e, exc_info=True)
         raise
@@ -1,6 +1,6 @@
+import functools
 import logging
 import os
-from datetime import datetime
 
 # ANSI color codes for console output
 COLORS = {
@@ -14,17 +14,28 @@ COLORS = {
 RESET = "\033[0m"
 
 
+# Color-wrapped level names, built once instead of on every record
+_COLORED_LEVELNAMES = {levelname: f"{color}{levelname}{RESET}" for levelname, color in COLORS.items()}
+
+
+@functools.lru_cache(maxsize=256)
+def _colored_name(name: str) -> str:
+    return f"{COLORS['MODULE']}{name}{RESET}"
+
+
 class ColorFormatter(logging.Formatter):
     """
     A logging formatter that adds color to log level names and module names, and includes milliseconds.
     """
 
+    # Without a datefmt, asctime uses default_time_format plus milliseconds via default_msec_format
+    default_time_format = "%Y-%m-%d %H:%M:%S"
+    default_msec_format = "%s.%03d"
+
     def format(self, record):
-        level_color = COLORS.get(record.levelname, RESET)
-        module_color = COLORS["MODULE"]
-        record.levelname = f"{level_color}{record.levelname}{RESET}"
-        record.name = f"{module_color}{record.name}{RESET}"
-        record.created_ms = datetime.fromtimestamp(record.created).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        levelname = record.levelname
+        record.levelname = _COLORED_LEVELNAMES.get(levelname) or f"{RESET}{levelname}{RESET}"
+        record.name = _colored_name(record.name)
         return super().format(record)
 
 
@@ -38,7 +49,7 @@ def setup_logging():
 
     console_handler = logging.StreamHandler()
     formatter = ColorFormatter(
-        fmt="%(created_ms)s [%(levelname)s] %(name)s: %(message)s",
+        fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
     console_handler.setFormatter(formatter)
 
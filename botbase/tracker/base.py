@@ -1,23 +1,63 @@
 import asyncio
+import contextlib
 import datetime
+import functools
+import inspect
 import logging
+import sys
 import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
-# Use "session" as the event type indicating a new session.
+# Built-in event types. Use "session" as the event type indicating a new session.
+USER_EVENT_TYPE = "user"
+BOT_EVENT_TYPE = "bot"
+SLOT_EVENT_TYPE = "slot"
 SESSION_EVENT_TYPE = "session"
 
+_UTC = datetime.timezone.utc
+# Timezone-aware replacement for the deprecated datetime.datetime.utcnow(). A partial with the
+# timezone bound is the cheapest way to get an aware "now" (faster than fromtimestamp(time_ns())).
+_utcnow = functools.partial(datetime.datetime.now, _UTC)
+
 
 class Event(BaseModel):
+    """
+    A single conversation event. Events built by the tracker itself from already well-typed values
+    use `Event.model_construct` to skip validation; channel input goes through the regular constructor.
+    """
+
     type: str
     text: Optional[str] = None
     payload: Dict[str, Any] = {}
-    created_at: datetime.datetime
+    created_at: datetime.datetime = Field(default_factory=_utcnow)
+
+    @classmethod
+    def from_stored(cls, data: Dict[str, Any]) -> "Event":
+        """
+        Build an event from data a tracker wrote earlier, skipping validation.
+        Anything that doesn't look like what the trackers write goes through full validation instead.
+        """
+        event_type = data.get("type")
+        created_at = data.get("created_at")
+        if isinstance(created_at, str):
+            if created_at.endswith("Z"):
+                # model_dump(mode="json") writes UTC as "Z", which fromisoformat only accepts from Python 3.11.
+                created_at = created_at[:-1] + "+00:00"
+            try:
+                created_at = datetime.datetime.fromisoformat(created_at)
+            except ValueError:
+                return cls.model_validate(data)
+        if not isinstance(event_type, str) or not isinstance(created_at, datetime.datetime):
+            return cls.model_validate(data)
+        # Interned, so loaded types are the same string objects as the constants above and compare by identity.
+        return cls.model_construct(
+            type=sys.intern(event_type), text=data.get("text"), payload=data.get("payload") or {}, created_at=created_at
+        )
 
 
 class ConversationTracker(ABC):
@@ -26,7 +66,10 @@ class ConversationTracker(ABC):
         self.events: List[Event] = []
         self._slots: Dict[str, Any] = {}
         self._persisted_count: int = 0  # tracks the number of events already persisted
-        self._event_callbacks: List[Callable[[Event], Any]] = []
+        self._pending: List[Event] = []  # events added since the last persist, in order
+        # (callback, is_coroutine_function) pairs; classified once at registration instead of per event.
+        self._event_callbacks: List[Tuple[Callable[[Event], Any], bool]] = []
+        self._last_user_event: Optional[Event] = None  # kept current by add_event, see last_user_message
         logger.debug(f"ConversationTracker initialized for conversation {self.conv_id}")
 
     @staticmethod
@@ -34,12 +77,28 @@ class ConversationTracker(ABC):
         """
         Find the index of the last session event.
         If no session event exists, return -1 so that all events are considered.
+        Searches from the end, since only the last one matters.
+        """
+        for i in range(len(events) - 1, -1, -1):
+            if events[i].type == SESSION_EVENT_TYPE:
+                return i
+        return -1
+
+    def _restore_events(self, events: List[Event]):
+        """
+        Replace the in-memory state with already persisted events of the current session.
+        Rebuilds the slots and the last user message from them.
         """
-        idx = -1
-        for i, e in enumerate(events):
-            if e.type == SESSION_EVENT_TYPE:
-                idx = i
-        return idx
+        self.events = events
+        self._slots = {}
+        self._last_user_event = None
+        for event in events:
+            if event.type == SLOT_EVENT_TYPE:
+                self._slots.update(event.payload)
+            elif event.type == USER_EVENT_TYPE:
+                self._last_user_event = event
+        self._persisted_count = len(events)
+        self._pending = []
 
     def get_slot(self, key: str, default: Any = None) -> Any:
         """
@@ -52,41 +111,42 @@ class ConversationTracker(ABC):
         Update a slot value and add a slot event.
         """
         self._slots[key] = value
-        slot_event = Event(type="slot", payload={key: value}, created_at=datetime.datetime.now(datetime.timezone.utc))
+        slot_event = Event.model_construct(type=SLOT_EVENT_TYPE, payload={key: value})
         self.add_event(slot_event)
         logger.debug(f"Slot '{key}' set to {value} for conversation {self.conv_id}")
 
     def register_callback(self, callback: Callable[[Event], Any]):
         """Register a callback to be called whenever a new event is added."""
-        self._event_callbacks.append(callback)
+        self._event_callbacks.append((callback, inspect.iscoroutinefunction(callback)))
         logger.debug(f"Callback {callback} registered for conversation {self.conv_id}")
 
     def add_event(self, event: Event):
         """Add an event and invoke registered callbacks."""
         self.events.append(event)
+        self._pending.append(event)
+        if event.type == USER_EVENT_TYPE:
+            self._last_user_event = event
         logger.debug(f"Event added to conversation {self.conv_id}: {event}")
         # Invoke callbacks (if they return a coroutine, schedule it)
-        for callback in self._event_callbacks:
+        for callback, is_async in self._event_callbacks:
+            if is_async:
+                asyncio.create_task(callback(event))
+                continue
             result = callback(event)
+            # Plain callables (e.g. lambdas) may still return a coroutine.
             if asyncio.iscoroutine(result):
                 asyncio.create_task(result)
 
     def send_bot_message(self, text: str, metadata: Dict[str, Any] = None):
-        bot_event = Event(
-            type="bot",
-            text=text,
-            payload=metadata or {},
-            created_at=datetime.datetime.now(datetime.timezone.utc),
-        )
+        bot_event = Event.model_construct(type=BOT_EVENT_TYPE, text=text, payload=metadata or {})
         self.add_event(bot_event)
         logger.info(f"Bot message added for conversation {self.conv_id}: {text}")
 
     def last_user_message(self) -> Optional[Event]:
-        for event in reversed(self.events):
-            if event.type == "user":
-                return event
-        logger.debug(f"No user message found for conversation {self.conv_id}")
-        return None
+        event = self._last_user_event
+        if event is None:
+            logger.debug(f"No user message found for conversation {self.conv_id}")
+        return event
 
     def renew_session(self):
         """
@@ -94,20 +154,40 @@ class ConversationTracker(ABC):
         A special session event is added so that persistence still records the fact
         that a new session has started.
         """
-        session_event = Event(
-            type=SESSION_EVENT_TYPE,
-            payload={},
-            created_at=datetime.datetime.now(datetime.timezone.utc),
-        )
+        session_event = Event.model_construct(type=SESSION_EVENT_TYPE, payload={})
         # Discard all events from earlier sessions.
         self.events = [session_event]
         self._slots = {}
+        self._last_user_event = None
         self._persisted_count = 0
+        self._pending = [session_event]
         logger.info(f"Renewed session for conversation {self.conv_id}")
 
+    def has_pending(self) -> bool:
+        """
+        Return True if there are events that have not been persisted yet.
+        """
+        return bool(self._pending)
+
+    @contextlib.contextmanager
+    def _persisting(self) -> Iterator[List[Event]]:
+        """
+        Detach the pending events for a persist() implementation to write.
+        Events added meanwhile queue up for the next persist; if writing fails,
+        the detached events are put back in front of them.
+        """
+        pending, self._pending = self._pending, []
+        try:
+            yield pending
+        except BaseException:
+            self._pending[:0] = pending
+            raise
+        self._persisted_count += len(pending)
+
     @abstractmethod
     async def persist(self):
         """
         Persist only new events (since last persist) to storage.
+        Implementations should return early when `has_pending()` is False.
         """
         pass
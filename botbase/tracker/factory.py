@@ -1,19 +1,54 @@
+from importlib import import_module
+
 from botbase.config import config
 
-if config.tracker == "jsonl":
-    from botbase.tracker.jsonl_tracker import JSONLTracker as TrackerImpl
-elif config.tracker == "postgresql":
-    from botbase.tracker.postgresql_tracker import PostgreSQLTracker as TrackerImpl
-elif config.tracker == "sqlite":
-    from botbase.tracker.sqlite.tracker import SQLiteTracker as TrackerImpl
-else:
-    raise ValueError("Invalid tracker type in configuration.")
+# tracker type -> (module, class name, name of its config section or None).
+# Only the configured backend's module is imported, so e.g. a JSONL deployment never loads SQLAlchemy.
+_TRACKERS = {
+    "jsonl": ("botbase.tracker.jsonl_tracker", "JSONLTracker", "jsonl"),
+    "postgresql": ("botbase.tracker.postgresql_tracker", "PostgreSQLTracker", None),
+    "sqlite": ("botbase.tracker.sqlite.tracker", "SQLiteTracker", "sqlite"),
+}
 
 
-async def create_tracker(conv_id: str = None):
-    if config.tracker == "jsonl":
-        return await TrackerImpl.create(config.jsonl, conv_id)
-    elif config.tracker == "sqlite":
-        return await TrackerImpl.create(config.sqlite, conv_id)
+def _make_factory(create, tracker_config=None):
+    """
+    Build the creation function for one backend, with its config section bound once.
+    """
+    if tracker_config is None:
+
+        async def create_backend_tracker(conv_id: str = None):
+            return await create(conv_id)
+
     else:
-        return await TrackerImpl.create(conv_id)
+
+        async def create_backend_tracker(conv_id: str = None):
+            return await create(tracker_config, conv_id)
+
+    return create_backend_tracker
+
+
+def _resolve(tracker_type: str):
+    try:
+        module_name, class_name, config_attr = _TRACKERS[tracker_type]
+    except KeyError:
+        raise ValueError("Invalid tracker type in configuration.") from None
+    tracker_cls = getattr(import_module(module_name), class_name)
+    tracker_config = getattr(config, config_attr) if config_attr else None
+    return tracker_type, _make_factory(tracker_cls.create, tracker_config)
+
+
+# (tracker type, creation function) for the configured backend.
+_backend = _resolve(config.tracker)
+
+
+async def create_tracker(conv_id: str = None):
+    """
+    Create a tracker for `conv_id` with the configured backend.
+    The backend is resolved once, and again only when `config.tracker` changes (see `config.set_config`).
+    """
+    global _backend
+    tracker_type, create = _backend
+    if tracker_type != config.tracker:
+        _backend = tracker_type, create = _resolve(config.tracker)
+    return await create(conv_id)
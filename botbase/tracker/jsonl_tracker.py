@@ -1,32 +1,199 @@
 """JSONL-based conversation tracker implementation."""
 
 import asyncio
-import datetime
-import json
+import atexit
+import functools
 import logging
+import os
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+import orjson
 
 from botbase.tracker.base import ConversationTracker, Event
 
 logger = logging.getLogger(__name__)
 
+# Serializes one JSONL record to a newline-terminated line. orjson writes datetimes as ISO 8601
+# natively; anything else unknown falls back to str().
+_encode_record = functools.partial(
+    orjson.dumps, default=str, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS
+)
+
+# Records written by this tracker start with the conv_id key (compact orjson or stdlib json spacing).
+_CONV_ID_PREFIXES = (b'{"conv_id":"', b'{"conv_id": "')
+
+
+def _line_conv_id(line: bytes) -> Optional[str]:
+    """
+    Return the conv_id of one JSONL record. Plain ids at the start of the line are sliced out
+    of the bytes directly; anything else (escapes, other key order) goes through a full parse.
+    Raises orjson.JSONDecodeError for malformed lines that need the full parse.
+    """
+    for prefix in _CONV_ID_PREFIXES:
+        if line.startswith(prefix):
+            start = len(prefix)
+            end = line.find(b'"', start)
+            if end != -1 and line.find(b"\\", start, end) == -1:
+                try:
+                    return line[start:end].decode()
+                except UnicodeDecodeError:
+                    pass
+            break
+    record = orjson.loads(line)
+    return record.get("conv_id") if isinstance(record, dict) else None
+
+
+class _OffsetIndex:
+    """
+    Byte offsets of each conversation's records in one JSONL file, so loading a conversation
+    reads only its own lines instead of parsing the whole file.
+    The index lives in memory and is built incrementally: each refresh only indexes bytes
+    appended since the previous one, including appends made by other processes.
+    Offsets are packed into one array per conversation, 8 bytes per record.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Guards the index against concurrent loads (event loop thread) and writes (executor thread).
+        self.lock = threading.Lock()
+        self._offsets: Dict[str, "array[int]"] = {}
+        self._indexed_size = 0
+        self._indexed_inode: Optional[int] = None
+        # Append handle kept open across persists; see _append_handle.
+        self._append_fh: Optional[BinaryIO] = None
+
+    def _add_offset(self, conv_id: str, offset: int):
+        offsets = self._offsets.get(conv_id)
+        if offsets is None:
+            offsets = self._offsets[conv_id] = array("Q")
+        offsets.append(offset)
+
+    def _refresh(self, f: BinaryIO):
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        if size < self._indexed_size or stat.st_ino != self._indexed_inode:
+            # The file was truncated or replaced; start over.
+            self._offsets.clear()
+            self._indexed_size = 0
+            self._indexed_inode = stat.st_ino
+        if size > self._indexed_size:
+            # Streamed line by line, so indexing a large file never holds more than one line in memory.
+            f.seek(self._indexed_size)
+            offset = self._indexed_size
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # A partial line still being written; the next refresh picks it up.
+                if line.strip():
+                    try:
+                        conv_id = _line_conv_id(line)
+                    except orjson.JSONDecodeError:
+                        logger.warning("Skipping malformed JSON line")
+                    else:
+                        self._add_offset(conv_id, offset)
+                offset += len(line)
+            self._indexed_size = offset
+
+    def read_lines(self, conv_id: str) -> List[bytes]:
+        """Return the raw, newline-terminated JSON lines stored for `conv_id`, in file order."""
+        with self.lock, self.path.open("rb") as f:
+            self._refresh(f)
+            lines = []
+            for offset in self._offsets.get(conv_id, ()):
+                f.seek(offset)
+                lines.append(f.readline())
+            return lines
+
+    def _append_handle(self) -> BinaryIO:
+        """
+        Return the shared append handle, reopening it if the file was deleted or replaced meanwhile.
+        A stat is much cheaper than the open/close pair it saves on every persist.
+        """
+        fh = self._append_fh
+        if fh is not None:
+            try:
+                if os.stat(self.path).st_ino == os.fstat(fh.fileno()).st_ino:
+                    return fh
+            except FileNotFoundError:
+                pass
+            fh.close()
+        self._append_fh = fh = self.path.open("ab")
+        return fh
+
+    def close(self):
+        with self.lock:
+            if self._append_fh is not None:
+                self._append_fh.close()
+                self._append_fh = None
+
+    def append(self, conv_id: str, lines: List[bytes], fsync: bool = False):
+        """
+        Append newline-terminated `lines` for `conv_id` to the file and index them directly.
+        With `fsync`, the whole batch is synced to disk with a single fsync.
+        """
+        with self.lock:
+            f = self._append_handle()
+            offset = f.seek(0, os.SEEK_END)
+            f.write(b"".join(lines))
+            # Flushed right away, so readers (and the index, which trusts the file size) see complete lines.
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+            if offset != self._indexed_size:
+                # Someone else appended since the last refresh; the next refresh indexes everything.
+                return
+            for line in lines:
+                self._add_offset(conv_id, offset)
+                offset += len(line)
+            self._indexed_size = offset
+
+
+_offset_indexes: Dict[Path, _OffsetIndex] = {}
+
+# A dedicated writer thread: persists don't compete with other work in the default executor,
+# and all appends run one after another in submission order.
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="botbase-jsonl-writer")
+
+
+@atexit.register
+def _close_offset_indexes():
+    for index in _offset_indexes.values():
+        index.close()
+
+
+def _get_offset_index(file_path: Path) -> _OffsetIndex:
+    key = file_path.resolve()
+    index = _offset_indexes.get(key)
+    if index is None:
+        index = _offset_indexes.setdefault(key, _OffsetIndex(key))
+    return index
+
 
 class JSONLTracker(ConversationTracker):
     @classmethod
     async def create(cls, config, conv_id: str = None) -> "JSONLTracker":
         """
         Asynchronously create a new JSONLTracker instance.
-        The config parameter is expected to have a `file_path` attribute.
+        The config parameter is expected to have a `file_path` attribute, and optionally `fsync` (default False).
+        History is read and parsed in a worker thread, so large files don't block the event loop.
         """
-        return cls(config.file_path, conv_id)
+        tracker = cls(config.file_path, conv_id, load_history=False, fsync=getattr(config, "fsync", False))
+        await asyncio.get_running_loop().run_in_executor(None, tracker._load_history)
+        return tracker
 
-    def __init__(self, file_path: str, conv_id: str = None):
+    def __init__(self, file_path: str, conv_id: str = None, load_history: bool = True, fsync: bool = False):
         super().__init__(conv_id)
         self.file_path = Path(file_path)
+        self.fsync = fsync
         if not self.file_path.exists():
             self.file_path.touch()
             logger.info(f"Created new JSONL file at {self.file_path}")
-        self._load_history()
+        self._index = _get_offset_index(self.file_path)
+        if load_history:
+            self._load_history()
 
     def _load_history(self):
         """
@@ -37,20 +204,20 @@ class JSONLTracker(ConversationTracker):
         logger.debug("Loading conversation history from JSONL file")
         loaded_events = []
         try:
-            with self.file_path.open("r", encoding="utf-8") as f:
-                for line in f:
-                    try:
-                        record = json.loads(line)
-                        if record.get("conv_id") != self.conv_id:
-                            continue
-                        event_data = record.get("event")
-                        if event_data:
-                            # Validate the event. If created_at is missing, this will error.
-                            event = Event.model_validate(event_data)
-                            loaded_events.append(event)
-                    except json.JSONDecodeError:
-                        logger.warning("Skipping malformed JSON line")
+            # Only this conversation's lines are read, via the offset index.
+            for line in self._index.read_lines(self.conv_id):
+                try:
+                    record = orjson.loads(line)
+                    if record.get("conv_id") != self.conv_id:
                         continue
+                    event_data = record.get("event")
+                    if event_data:
+                        # Trusted data we wrote ourselves; a missing created_at defaults to the load time.
+                        event = Event.from_stored(event_data)
+                        loaded_events.append(event)
+                except orjson.JSONDecodeError:
+                    logger.warning("Skipping malformed JSON line")
+                    continue
         except Exception as e:
             logger.error(f"Error loading history from JSONL: {e}", exc_info=True)
 
@@ -59,17 +226,10 @@ class JSONLTracker(ConversationTracker):
             last_session_index = self._get_last_session_index(loaded_events)
             if last_session_index >= 0:
                 # Only keep events from the last session event onward.
-                self.events = loaded_events[last_session_index:]
-            else:
-                self.events = loaded_events
-
-            # Rebuild the slots from events in the current session.
-            self._slots = {}
-            for event in self.events:
-                if event.type == "slot":
-                    self._slots.update(event.payload)
+                loaded_events = loaded_events[last_session_index:]
 
-            self._persisted_count = len(self.events)
+            # Rebuild the events, slots and last user message from the current session.
+            self._restore_events(loaded_events)
             logger.info(f"Loaded {self._persisted_count} events from JSONL file for conversation {self.conv_id}")
         else:
             logger.info(f"No historical events found for conversation {self.conv_id}")
@@ -78,27 +238,17 @@ class JSONLTracker(ConversationTracker):
         """
         Persist new events (those not yet written) to the JSONL file.
         """
-        new_events = self.events[self._persisted_count :]
-        if not new_events:
+        if not self.has_pending():
             logger.debug("No new events to persist in JSONL")
             return
+        with self._persisting() as new_events:
+            logger.info(f"Persisting {len(new_events)} new events to JSONL")
+            loop = asyncio.get_running_loop()
+
+            def write_events():
+                conv_id = self.conv_id
+                lines = [_encode_record({"conv_id": conv_id, "event": event.model_dump()}) for event in new_events]
+                self._index.append(self.conv_id, lines, fsync=self.fsync)
 
-        logger.info(f"Persisting {len(new_events)} new events to JSONL")
-        loop = asyncio.get_event_loop()
-
-        def write_events():
-            with self.file_path.open("a", encoding="utf-8") as f:
-                for event in new_events:
-                    record = {"conv_id": self.conv_id, "event": event.model_dump()}
-                    f.write(
-                        json.dumps(
-                            record,
-                            default=lambda o: o.isoformat() if isinstance(o, datetime.datetime) else str(o),
-                            ensure_ascii=False,
-                        )
-                        + "\n"
-                    )
-
-        await loop.run_in_executor(None, write_events)
-        self._persisted_count = len(self.events)
+            await loop.run_in_executor(_writer, write_events)
         logger.info("Persistence to JSONL file complete")
@@ -1,14 +1,17 @@
 import logging
 
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import func, insert, select
 
 from botbase.database import async_session
 from botbase.models import ConversationEvent
-from botbase.tracker.base import ConversationTracker, Event
+from botbase.tracker.base import SESSION_EVENT_TYPE, ConversationTracker, Event
 
 logger = logging.getLogger(__name__)
 
+# Built once; SQLAlchemy's compiled cache then serves every persist from the same statement.
+_INSERT_STMT = insert(ConversationEvent)
+_LOAD_BATCH_SIZE = 1000  # Rows fetched per round trip while streaming history
+
 
 class PostgreSQLTracker(ConversationTracker):
     def __init__(self, conv_id: str = None):
@@ -21,45 +24,46 @@ class PostgreSQLTracker(ConversationTracker):
     async def _load_history(self):
         """
         Load past events for this conversation from the PostgreSQL database.
-        Rebuilds the tracker's event list and slot state.
+        Rebuilds the tracker's event list and slot state from the current session.
+        Rows before the latest session event are skipped in the query itself, so earlier
+        sessions are never sent over the wire; the rest is streamed in batches.
         """
         logger.debug("Loading conversation history from PostgreSQL")
-        async with async_session() as session:
-            result = await session.execute(
-                select(ConversationEvent)
-                .where(ConversationEvent.conv_id == self.conv_id)
-                .order_by(ConversationEvent.created_at)
+        session_start = (
+            select(func.coalesce(func.max(ConversationEvent.id), 0))
+            .where(
+                ConversationEvent.conv_id == self.conv_id,
+                ConversationEvent.event_type == SESSION_EVENT_TYPE,
             )
-            rows = result.scalars().all()
-            for row in rows:
-                event = Event.model_validate(row.payload)
-                self.events.append(event)
-                if event.type == "slot":
-                    self.slots.update(event.payload)
-            self._persisted_count = len(self.events)
+            .scalar_subquery()
+        )
+        stmt = (
+            select(ConversationEvent.payload)
+            .where(ConversationEvent.conv_id == self.conv_id, ConversationEvent.id >= session_start)
+            .order_by(ConversationEvent.id)
+            .execution_options(yield_per=_LOAD_BATCH_SIZE)
+        )
+        async with async_session() as session:
+            loaded_events = [Event.from_stored(payload) async for payload in await session.stream_scalars(stmt)]
+            self._restore_events(loaded_events)
             logger.info(f"Loaded {self._persisted_count} historical events for conversation {self.conv_id}")
 
     async def persist(self):
         """
         Persist new events (those not yet stored) to PostgreSQL.
-        Uses jsonable_encoder to properly serialize any datetime or non-serializable types.
+        Uses model_dump(mode="json") to turn datetimes and other values into JSON-safe types.
         """
-        new_events = self.events[self._persisted_count :]
-        if not new_events:
+        if not self.has_pending():
             logger.debug("No new events to persist in PostgreSQL")
             return
-
-        logger.info(f"Persisting {len(new_events)} new events to PostgreSQL")
-        async with async_session() as session:
-            async with session.begin():
-                for event in new_events:
-                    payload = jsonable_encoder(event)
-                    conv_event = ConversationEvent(
-                        conv_id=self.conv_id,
-                        event_type=event.type,
-                        payload=payload,
-                    )
-                    session.add(conv_event)
-            await session.commit()
-        self._persisted_count = len(self.events)
+        with self._persisting() as new_events:
+            logger.info(f"Persisting {len(new_events)} new events to PostgreSQL")
+            rows = [
+                {"conv_id": self.conv_id, "event_type": event.type, "payload": event.model_dump(mode="json")}
+                for event in new_events
+            ]
+            # One executemany INSERT for the whole batch; session.begin() commits on exit.
+            async with async_session() as session:
+                async with session.begin():
+                    await session.execute(_INSERT_STMT, rows)
         logger.info("Persistence to PostgreSQL complete")
@@ -1,11 +1,13 @@
 """SQLite database implementation for conversation tracking."""
 
 from pathlib import Path
-from typing import Optional
+from typing import Dict
 
-from sqlalchemy import JSON, TIMESTAMP, Column, Index, Integer, String, func
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import orjson
+from sqlalchemy import JSON, TIMESTAMP, Column, Index, Integer, String, event, func
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 Base = declarative_base()
 
@@ -21,43 +23,101 @@ class ConversationEvent(Base):
     payload = Column(JSON, nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
 
-    __table_args__ = (Index("ix_conversation_events_conv_id", "conv_id"),)
+    # Serves both the conv_id filter and the created_at ordering of history loads, without a sort step.
+    __table_args__ = (Index("ix_conv_events_conv_created", "conv_id", "created_at"),)
 
 
 def get_sqlite_url(db_path: str) -> str:
-    """Get SQLite URL from database path."""
+    """
+    Get SQLite URL from database path.
+    SQLite URI filenames ("file:name?mode=memory&cache=shared") are opened as URIs.
+    """
+    if db_path.startswith("file:"):
+        separator = "&" if "?" in db_path else "?"
+        return f"sqlite+aiosqlite:///{db_path}{separator}uri=true"
     return f"sqlite+aiosqlite:///{db_path}"
 
 
-# Global session factory for SQLite.
-_global_async_session: Optional[sessionmaker] = None
+def _is_memory_database(db_path: str) -> bool:
+    return db_path == ":memory:" or (db_path.startswith("file:") and "mode=memory" in db_path)
 
 
-async def init_database(db_path: str) -> sessionmaker:
-    """
-    Initialize SQLite database and return a globally shared session factory.
-    If already initialized, return the existing session factory.
-    """
-    global _global_async_session
-    if _global_async_session is not None:
-        return _global_async_session
+def _json_serializer(value) -> str:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+# Applied to every new connection.
+_SQLITE_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",  # Wait up to 5s for a competing writer instead of failing with "database is locked"
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",  # 64 MiB page cache (negative values are KiB)
+)
+# Only meaningful for file databases. WAL lets readers and the writer proceed concurrently, and with
+# synchronous=NORMAL a commit no longer waits for an fsync (durable across crashes, not power loss).
+_SQLITE_FILE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MiB
+)
+
+
+def _make_pragma_listener(db_path: str):
+    pragmas = _SQLITE_PRAGMAS if _is_memory_database(db_path) else _SQLITE_PRAGMAS + _SQLITE_FILE_PRAGMAS
+
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
 
-    db_file = Path(db_path)
-    db_file.parent.mkdir(parents=True, exist_ok=True)
+    return set_sqlite_pragmas
 
+
+def _create_schema(sync_conn):
+    Base.metadata.create_all(sync_conn)
+    # create_all skips tables that already exist, so indexes added later would never reach older databases.
+    for index in ConversationEvent.__table__.indexes:
+        index.create(sync_conn, checkfirst=True)
+
+
+# Session factories by database path. Each owns one engine whose connection pool is reused
+# process-wide, so tracker operations don't reopen the database files.
+_session_factories: Dict[str, async_sessionmaker] = {}
+
+
+async def init_database(db_path: str) -> async_sessionmaker:
+    """
+    Initialize the SQLite database at `db_path` and return its shared session factory.
+    If that database is already initialized, return the existing session factory.
+    """
+    session_factory = _session_factories.get(db_path)
+    if session_factory is not None:
+        return session_factory
+
+    if db_path != ":memory:" and not db_path.startswith("file:"):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+
+    pool_options = {}
+    if _is_memory_database(db_path):
+        # An in-memory database lives only as long as its connections, so keep exactly one open and let
+        # sessions queue for it (concurrent shared-cache connections fail with "table is locked" instead).
+        pool_options = {"poolclass": AsyncAdaptedQueuePool, "pool_size": 1, "max_overflow": 0}
     engine = create_async_engine(
         get_sqlite_url(db_path),
         echo=False,  # Set to False in production
+        # The JSON payload column is encoded and decoded with orjson instead of the stdlib json module.
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
+        **pool_options,
     )
+    event.listen(engine.sync_engine, "connect", _make_pragma_listener(db_path))
 
-    async_session = sessionmaker(
-        engine,
-        class_=AsyncSession,
-        expire_on_commit=False,
-    )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
 
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_create_schema)
 
-    _global_async_session = async_session
-    return _global_async_session
+    _session_factories[db_path] = session_factory
+    return session_factory
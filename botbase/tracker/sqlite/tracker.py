@@ -1,14 +1,12 @@
 """SQLite-based conversation tracker implementation."""
 
-import datetime
 import logging
-from typing import List, Tuple
+from typing import List
 
-from fastapi.encoders import jsonable_encoder
-from sqlalchemy import select
+from sqlalchemy import func, insert, select
 
 from botbase.config import SqliteTrackerConfig
-from botbase.tracker.base import ConversationTracker, Event
+from botbase.tracker.base import SESSION_EVENT_TYPE, ConversationTracker, Event
 from botbase.tracker.sqlite.database import ConversationEvent, init_database
 
 logger = logging.getLogger(__name__)
@@ -18,6 +16,10 @@ logger = logging.getLogger(__name__)
 logging.getLogger("aiosqlite").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Built once; SQLAlchemy's compiled cache then serves every persist from the same statement.
+_INSERT_STMT = insert(ConversationEvent)
+_LOAD_BATCH_SIZE = 1000  # Rows fetched per round trip while streaming history
+
 
 class SQLiteTracker(ConversationTracker):
     """SQLite-based conversation tracker that uses a shared async engine/session."""
@@ -52,70 +54,61 @@ class SQLiteTracker(ConversationTracker):
         Initialize the tracker by obtaining the shared session factory and loading
         conversation history from SQLite.
 
-        This method loads all events from the database, finds the most recent session event,
-        and then rebuilds the in-memory state (events and slots) using only events from the
-        current session.
+        Only rows from the most recent session event onward are selected, so earlier sessions
+        are skipped by SQLite itself; those rows are streamed in batches and the in-memory state
+        (events and slots) is rebuilt from them.
         """
         logger.debug("Initializing SQLiteTracker: loading conversation history using shared session")
         # Obtain the shared session factory (and initialize the database if needed).
         self._session_factory = await init_database(self.config.db_path)
 
-        async with self._session_factory() as session:
-            result = await session.execute(
-                select(ConversationEvent)
-                .where(ConversationEvent.conv_id == self.conv_id)
-                .order_by(ConversationEvent.created_at)
+        session_start = (
+            select(func.coalesce(func.max(ConversationEvent.id), 0))
+            .where(
+                ConversationEvent.conv_id == self.conv_id,
+                ConversationEvent.event_type == SESSION_EVENT_TYPE,
             )
-            rows = result.scalars().all()
-
-            loaded_events: List[Tuple[Event, str]] = []
-            # Build a list of tuples: (parsed event, stored event type)
-            for row in rows:
+            .scalar_subquery()
+        )
+        stmt = (
+            select(ConversationEvent.payload)
+            .where(ConversationEvent.conv_id == self.conv_id, ConversationEvent.id >= session_start)
+            .order_by(ConversationEvent.created_at, ConversationEvent.id)
+            .execution_options(yield_per=_LOAD_BATCH_SIZE)
+        )
+        loaded_events: List[Event] = []
+        async with self._session_factory() as session:
+            async for payload in await session.stream_scalars(stmt):
                 try:
                     # Parse the stored payload into an Event instance.
-                    event_obj = Event(**row.payload)
-                    loaded_events.append((event_obj, row.event_type))
+                    event_obj = Event.from_stored(payload)
                 except Exception as e:
                     logger.error("Error parsing event from payload", exc_info=e)
-
-            # Find the index of the last session event (if any).
-            last_session_index = self._get_last_session_index([e for (e, _) in loaded_events])
-            if last_session_index >= 0:
-                # Only keep events from the last session event onward.
-                loaded_events = loaded_events[last_session_index:]
-            # Else, if no session event was found, all events are part of the current session.
-
-            # Rebuild in-memory events and slots from the filtered list.
-            for event_obj, _ in loaded_events:
-                self.events.append(event_obj)
-                if event_obj.type == "slot":
-                    # Update slots with the data from slot events.
-                    self._slots.update(event_obj.payload)
-            self._persisted_count = len(self.events)
+                    continue
+                if event_obj.type == SESSION_EVENT_TYPE:
+                    # Normally only the first row; anything before a session event is discarded.
+                    loaded_events = []
+                loaded_events.append(event_obj)
+
+            # Rebuild in-memory events, slots and last user message from the current session.
+            self._restore_events(loaded_events)
             logger.info(f"Loaded {len(self.events)} historical events for conversation {self.conv_id}")
 
     async def persist(self) -> None:
         """
         Persist new events (those not yet stored) to SQLite using the shared session.
         """
-        new_events = self.events[self._persisted_count :]
-        if not new_events:
+        if not self.has_pending():
             logger.debug("No new events to persist in SQLite")
             return
-
-        logger.info(f"Persisting {len(new_events)} new events to SQLite")
-        async with self._session_factory() as session:
-            async with session.begin():
-                for event in new_events:
-                    if event.created_at is None:
-                        event.created_at = datetime.datetime.now()
-                    payload = jsonable_encoder(event)
-                    conv_event = ConversationEvent(
-                        conv_id=self.conv_id,
-                        event_type=event.type,
-                        payload=payload,
-                    )
-                    session.add(conv_event)
-            await session.commit()
-        self._persisted_count = len(self.events)
+        with self._persisting() as new_events:
+            logger.info(f"Persisting {len(new_events)} new events to SQLite")
+            rows = [
+                {"conv_id": self.conv_id, "event_type": event.type, "payload": event.model_dump(mode="json")}
+                for event in new_events
+            ]
+            # One executemany INSERT for the whole batch; session.begin() commits on exit.
+            async with self._session_factory() as session:
+                async with session.begin():
+                    await session.execute(_INSERT_STMT, rows)
         logger.info("Persistence to SQLite complete")
@@ -1,17 +1,23 @@
+import asyncio
 import datetime
+import functools
 import logging
+import time
 import uuid
+from typing import Optional, Tuple
 
 import aiohttp
+import orjson
 from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
 
-from botbase.channels.base import BaseChannel
-from botbase.events import handle_event
+from botbase.channels.base import JSON_HEADERS, BaseChannel
 from botbase.tracker.base import ConversationTracker, Event
 from botbase.tracker.factory import create_tracker
 
 logger = logging.getLogger(__name__)
 
+_OUTBOX_FLUSH_TIMEOUT = 5  # Seconds close() waits for queued messages to be sent.
+
 
 class JivoChatChannel(BaseChannel):
     """
@@ -47,9 +53,17 @@ class JivoChatChannel(BaseChannel):
         self.provider_id = provider_id
         self.shared_token = shared_token
         self.jivo_api_base_url = jivo_api_base_url
+        # Created at startup, inside the running event loop.
+        self._outbox: Optional["asyncio.Queue[Tuple[Event, str]]"] = None
+        self._sender_task: Optional[asyncio.Task] = None
 
         self.router.post(f"/{self.shared_token}")(self.process_request)
 
+    def _session_kwargs(self):
+        # Reusing one session keeps connections to Jivo alive between messages.
+        connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, keepalive_timeout=30, ttl_dns_cache=300)
+        return {"connector": connector, "timeout": aiohttp.ClientTimeout(total=8)}
+
     def register_routes(self, app: FastAPI):
         app.include_router(self.router)
         logger.info(
@@ -63,7 +77,7 @@ class JivoChatChannel(BaseChannel):
         background_tasks: BackgroundTasks,
     ):
         try:
-            data = await request.json()
+            data = orjson.loads(await request.body())
         except Exception as e:
             logger.error(f"Failed to parse JSON from JivoChat request: {e}")
             raise HTTPException(
@@ -86,14 +100,15 @@ class JivoChatChannel(BaseChannel):
             logger.info(f"Received JivoChat CLIENT_MESSAGE for chat_id: {chat_id} from client_id: {client_id}")
             tracker = await create_tracker(chat_id)
 
-            tracker.register_callback(lambda bot_event: self.on_tracker_event(bot_event, tracker))
+            tracker.register_callback(functools.partial(self.on_tracker_event, tracker=tracker))
 
-            timestamp_unix = message_data.get("timestamp", int(datetime.datetime.utcnow().timestamp()))
+            now = time.time()
+            timestamp_unix = message_data.get("timestamp", int(now))
             try:
                 created_dt = datetime.datetime.fromtimestamp(timestamp_unix, tz=datetime.timezone.utc)
             except (TypeError, ValueError):
                 logger.warning(f"Invalid timestamp format from Jivo: {timestamp_unix}. Using current time.")
-                created_dt = datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc)
+                created_dt = datetime.datetime.fromtimestamp(now, tz=datetime.timezone.utc)
 
             user_event = Event(
                 type="user",
@@ -105,8 +120,7 @@ class JivoChatChannel(BaseChannel):
             tracker.add_event(user_event)
             logger.debug(f"User event from JivoChat (chat_id: {chat_id}) added to tracker.")
 
-            background_tasks.add_task(handle_event, tracker)
-            background_tasks.add_task(tracker.persist)
+            background_tasks.add_task(self._handle_and_persist, tracker)
 
             return {"status": "ok", "message": "CLIENT_MESSAGE received and processing initiated."}
 
@@ -128,10 +142,26 @@ class JivoChatChannel(BaseChannel):
                 "error": {"code": "unsupported_event", "message": f"Unsupported or unknown event type: {event_type}"}
             }
 
+    async def on_startup(self, app):
+        self._outbox = asyncio.Queue()
+        self._sender_task = asyncio.create_task(self._sender())
+
     async def on_tracker_event(self, event: Event, tracker: ConversationTracker):
         if event.type == "bot":
             logger.info(f"New bot event detected for JivoChat conversation {tracker.conv_id}: '{event.text}'")
-            await self.dispatch_bot_event(event, tracker.conv_id)
+            if self._outbox is not None:
+                # The handler continues right away; the sender posts messages in order.
+                self._outbox.put_nowait((event, tracker.conv_id))
+            else:
+                await self.dispatch_bot_event(event, tracker.conv_id)
+
+    async def _sender(self):
+        while True:
+            event, conv_id = await self._outbox.get()
+            try:
+                await self.dispatch_bot_event(event, conv_id)
+            finally:
+                self._outbox.task_done()
 
     async def dispatch_bot_event(self, event: Event, conv_id: str):
         if not self.provider_id or not self.shared_token:
@@ -140,21 +170,18 @@ class JivoChatChannel(BaseChannel):
 
         webhook_url = f"{self.jivo_api_base_url}/{self.provider_id}/{self.shared_token}"
 
+        timestamp = int(event.created_at.timestamp() if event.created_at else time.time())
         message_content = {
             "type": "TEXT",
             "text": event.text or "",
-            "timestamp": int(
-                event.created_at.timestamp() if event.created_at else datetime.datetime.utcnow().timestamp()
-            ),
+            "timestamp": timestamp,
         }
 
         if event.payload:
             if "jivo_message" in event.payload and isinstance(event.payload["jivo_message"], dict):
                 message_content = event.payload["jivo_message"]
                 if "timestamp" not in message_content:
-                    message_content["timestamp"] = int(
-                        event.created_at.timestamp() if event.created_at else datetime.datetime.utcnow().timestamp()
-                    )
+                    message_content["timestamp"] = timestamp
             elif "buttons" in event.payload and isinstance(event.payload["buttons"], list):
                 message_content["type"] = "BUTTONS"
                 message_content["title"] = str(event.payload.get("title", event.text or "Please choose:"))
@@ -163,27 +190,37 @@ class JivoChatChannel(BaseChannel):
                     event.payload.get("fallback_text", event.text or message_content["title"])
                 )
 
-        jivo_payload = {"event": "BOT_MESSAGE", "id": str(uuid.uuid4()), "chat_id": conv_id, "message": message_content}
+        jivo_payload = {"event": "BOT_MESSAGE", "id": uuid.uuid4().hex, "chat_id": conv_id, "message": message_content}
 
         logger.info(f"Dispatching BOT_MESSAGE to JivoChat ({webhook_url}) for chat_id {conv_id}: {jivo_payload}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(webhook_url, json=jivo_payload, timeout=aiohttp.ClientTimeout(total=8)) as resp:
-                    response_text = await resp.text()
-                    if resp.status == 200:
-                        logger.info(
-                            f"Successfully dispatched BOT_MESSAGE to JivoChat for chat_id {conv_id}. "
-                            f"Response status: {resp.status}, body: {response_text[:200]}"
-                        )
-                    else:
-                        logger.error(
-                            f"Failed to dispatch BOT_MESSAGE to JivoChat for chat_id {conv_id}. "
-                            f"HTTP status: {resp.status}, Response: {response_text}"
-                        )
+            session = await self._get_session()
+            async with session.post(webhook_url, data=orjson.dumps(jivo_payload), headers=JSON_HEADERS) as resp:
+                response_text = await resp.text()
+                if resp.status == 200:
+                    logger.info(
+                        f"Successfully dispatched BOT_MESSAGE to JivoChat for chat_id {conv_id}. "
+                        f"Response status: {resp.status}, body: {response_text[:200]}"
+                    )
+                else:
+                    logger.error(
+                        f"Failed to dispatch BOT_MESSAGE to JivoChat for chat_id {conv_id}. "
+                        f"HTTP status: {resp.status}, Response: {response_text}"
+                    )
         except Exception as e:
             logger.error(
                 f"Exception dispatching BOT_MESSAGE to JivoChat for chat_id {conv_id}: {str(e)}", exc_info=True
             )
 
-    def close(self):
-        pass
+    async def close(self):
+        if self._outbox is not None:
+            try:
+                await asyncio.wait_for(self._outbox.join(), _OUTBOX_FLUSH_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Dropping unsent JivoChat messages after {_OUTBOX_FLUSH_TIMEOUT}s")
+            self._outbox = None
+        if self._sender_task is not None:
+            self._sender_task.cancel()
+            await asyncio.gather(self._sender_task, return_exceptions=True)
+            self._sender_task = None
+        await self._close_session()
@@ -11,11 +11,14 @@ from botbase.tracker import ConversationTracker
 
 logger = logging.getLogger(__name__)
 
+_GREETINGS = frozenset({"hello", "hi", "hey"})
+
 
 @handler()
 async def handle_greet(tracker: ConversationTracker):
     last = tracker.last_user_message()
-    if last and last.text.lower() in ["hello", "hi", "hey"]:
+    text = last.text.lower() if last else ""
+    if text in _GREETINGS:
         first_greeting = not tracker.get_slot("greeted", False)
         if first_greeting:
             tracker.send_bot_message("Hi!", metadata={"first_greeting": True})
@@ -27,9 +30,10 @@ async def handle_greet(tracker: ConversationTracker):
 @handler()
 async def handle_counter(tracker: ConversationTracker):
     last = tracker.last_user_message()
-    if last and last.text.lower().startswith("count "):
+    text = last.text.lower() if last else ""
+    if text.startswith("count "):
         try:
-            count = int(last.text.split()[1])
+            count = int(text.split()[1])
             for i in range(1, count + 1):
                 tracker.send_bot_message(f"Counting: {i}")
                 if i != count:
@@ -41,7 +45,8 @@ async def handle_counter(tracker: ConversationTracker):
 @handler()
 async def handle_reset(tracker: ConversationTracker):
     last = tracker.last_user_message()
-    if last and last.text.lower() == "/reset":
+    text = last.text.lower() if last else ""
+    if text == "/reset":
         tracker.renew_session()
         tracker.send_bot_message("Session reset. Start a new conversation.")
 
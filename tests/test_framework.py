@@ -1,16 +1,16 @@
 import datetime
-import importlib
-import sys
 
 import pytest
 import yaml
-from fastapi import FastAPI
 
 from botbase import botapi, events
 from botbase.events import handle_event, handler
 from botbase.tracker.base import ConversationTracker, Event
 from botbase.tracker.factory import create_tracker
 
+# Same loader choice as botbase.config: the libyaml bindings when available.
+_Dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 # --- Test Configuration Loading ---
 
 
@@ -24,16 +24,28 @@ def test_config_loading(tmp_path, monkeypatch):
         "channels": [{"type": "webhook", "url": "http://localhost:8000/webhook"}],
     }
     config_file = tmp_path / "config.yml"
-    config_file.write_text(yaml.dump(config_data))
+    config_file.write_text(yaml.dump(config_data, Dumper=_Dumper))
     monkeypatch.setenv("CONFIG_FILE", str(config_file))
     import botbase.config as config_module
 
-    importlib.reload(config_module)
-    new_config = config_module.config
+    new_config = config_module.load_config()
     assert new_config.tracker == "jsonl"
     assert new_config.jsonl.file_path == str(tmp_path / "test_events.jsonl")
 
 
+def test_env_var_substitution(monkeypatch):
+    """
+    ${VAR} references are replaced from the environment; unset variables are left as their name.
+    """
+    import botbase.config  # noqa: F401  (registers the !env_var resolver)
+
+    monkeypatch.setenv("BOT_HOST", "example.com")
+    monkeypatch.setenv("BOT_PORT", "${BOT_HOST}")
+    monkeypatch.delenv("BOT_MISSING", raising=False)
+    data = yaml.safe_load("url: ${BOT_HOST}:${BOT_PORT}/${BOT_MISSING}")
+    assert data["url"] == "example.com:${BOT_HOST}/BOT_MISSING"
+
+
 # --- Test Conversation Tracker Functionality ---
 
 
@@ -80,6 +92,40 @@ async def test_last_user_message(tmp_path):
     assert last_user.type == "user"
     assert last_user.text == "User message"
 
+    # The last user message survives a reload and is cleared by a new session.
+    await tracker.persist()
+    reloaded = JSONLTracker(file_path=str(file_path), conv_id="test_conv")
+    assert reloaded.last_user_message().text == "User message"
+    reloaded.renew_session()
+    assert reloaded.last_user_message() is None
+
+
+@pytest.mark.asyncio
+async def test_event_callbacks(tmp_path):
+    """
+    Sync callbacks run inline; coroutine functions (also behind functools.partial) and plain
+    callables returning a coroutine are scheduled as tasks.
+    """
+    import asyncio
+    import functools
+
+    from botbase.tracker.jsonl_tracker import JSONLTracker
+
+    tracker = JSONLTracker(file_path=str(tmp_path / "events.jsonl"), conv_id="test_conv")
+    received = []
+
+    async def on_event(event, tag):
+        received.append((tag, event.text))
+
+    tracker.register_callback(lambda event: received.append(("sync", event.text)))
+    tracker.register_callback(functools.partial(on_event, tag="partial"))
+    tracker.register_callback(lambda event: on_event(event, "lambda"))
+
+    tracker.send_bot_message("Hello")
+    assert received == [("sync", "Hello")]
+    await asyncio.sleep(0)
+    assert sorted(received) == [("lambda", "Hello"), ("partial", "Hello"), ("sync", "Hello")]
+
 
 @pytest.mark.asyncio
 async def test_set_slot(tmp_path):
@@ -119,6 +165,16 @@ async def test_persistence_jsonl_tracker(tmp_path):
     assert len(tracker2.events) >= len(tracker1.events)
 
 
+def test_event_from_stored_accepts_utc_z_suffix():
+    """
+    SQL trackers store model_dump(mode="json"), which writes UTC timestamps with a "Z" suffix.
+    """
+    created_at = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    stored = Event(type="user", text="hi", created_at=created_at).model_dump(mode="json")
+    assert stored["created_at"].endswith("Z")
+    assert Event.from_stored(stored).created_at == created_at
+
+
 # --- Test Event Handling Registration and Execution ---
 
 
@@ -160,18 +216,20 @@ async def test_handle_event():
 # --- Test Webhook Channel and BotAPI Initialization ---
 
 
-@pytest.mark.asyncio
-async def test_webhook_channel_process_request(tmp_path, monkeypatch):
+@pytest.fixture(scope="module")
+def webhook_client(tmp_path_factory):
     """
-    Use FastAPI's TestClient to simulate a POST request to the webhook endpoint.
-    This test creates a temporary configuration file so that the webhook channel is
-    instantiated with the desired parameters.
+    A TestClient for an app with one webhook channel, shared by the webhook tests.
+    The app's startup and shutdown hooks run once per module; tests use distinct conv_ids.
+    The original config is restored afterwards.
     """
     from fastapi.testclient import TestClient
 
+    import botbase.config as config_module
+
     config_data = {
         "tracker": "jsonl",
-        "jsonl": {"file_path": str(tmp_path / "test_events.jsonl")},
+        "jsonl": {"file_path": str(tmp_path_factory.mktemp("webhook") / "test_events.jsonl")},
         "channels": [
             {
                 "type": "webhook",
@@ -181,24 +239,23 @@ async def test_webhook_channel_process_request(tmp_path, monkeypatch):
             }
         ],
     }
-    config_file = tmp_path / "config.yml"
-    config_file.write_text(yaml.dump(config_data))
-    monkeypatch.setenv("CONFIG_FILE", str(config_file))
-
-    import botbase.config as config_module
-
-    importlib.reload(config_module)
-    import botbase.botapi as botapi
-
-    importlib.reload(botapi)
+    original = config_module.config.model_copy(deep=True)
+    config_module.set_config(config_module.AppConfig(**config_data))
+    try:
+        with TestClient(botapi.create_app()) as client:
+            yield client
+    finally:
+        config_module.set_config(original)
 
-    botapi.app = FastAPI(title="Test Chatbot")
-    botapi.init()
 
-    client = TestClient(botapi.app)
+@pytest.mark.asyncio
+async def test_webhook_channel_process_request(webhook_client):
+    """
+    Use FastAPI's TestClient to simulate a POST request to the webhook endpoint.
+    """
     payload = {"conv_id": "test_conv", "text": "hello"}
     headers = {"Authorization": "Bearer test-secret"}
-    response = client.post("/channels/webhook/", json=payload, headers=headers)
+    response = webhook_client.post("/channels/webhook/", json=payload, headers=headers)
     assert response.status_code == 200, f"Expected 200, got {response.status_code}"
 
     # Verify that the channel name is in the event payload
@@ -212,82 +269,36 @@ async def test_webhook_channel_process_request(tmp_path, monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_telegram_channel_metadata(tmp_path, monkeypatch):
-    """
-    Test that TelegramChannel correctly adds the channel name to the event payload.
-    """
-    import importlib
-
-    import aiohttp
+async def test_webhook_channel_rejects_invalid_token(webhook_client):
+    payload = {"conv_id": "test_conv_invalid_token", "text": "hello"}
+    headers = {"Authorization": "Bearer wrong-secret"}
+    response = webhook_client.post("/channels/webhook/", json=payload, headers=headers)
+    assert response.json() == {"status": "error", "message": "Invalid token"}
 
-    import botbase.botapi as botapi
-    import botbase.config as config_module
-    from botbase.channels.telegram import TelegramChannel
-
-    # Mock aiohttp to simulate Telegram API response
-    class MockResponse:
-        def __init__(self, json_data, status=200):
-            self._json_data = json_data
-            self.status = status
-
-        async def json(self):
-            return self._json_data
-
-        async def __aexit__(self, exc_type, exc_val, exc_tb):
-            pass
-
-        async def __aenter__(self):
-            return self
+    tracker = await create_tracker(conv_id="test_conv_invalid_token")
+    assert tracker.last_user_message() is None
 
-    async def mock_get(url, params=None):
-        if "getUpdates" in url:
-            return MockResponse(
-                {
-                    "ok": True,
-                    "result": [
-                        {
-                            "update_id": 12345,
-                            "message": {
-                                "message_id": 1,
-                                "from": {"id": 123, "is_bot": False, "first_name": "Test"},
-                                "chat": {"id": 123, "type": "private"},
-                                "date": int(datetime.datetime.now().timestamp()),
-                                "text": "/start",
-                            },
-                        }
-                    ],
-                }
-            )
-        return MockResponse({})
 
-    monkeypatch.setattr(aiohttp.ClientSession, "get", mock_get)
+@pytest.mark.asyncio
+async def test_telegram_channel_metadata(monkeypatch):
+    """
+    Test that TelegramChannel correctly adds the channel name to the event payload.
+    """
+    from botbase.channels import telegram
 
-    # Setup config for TelegramChannel
-    config_data = {
-        "tracker": "jsonl",
-        "jsonl": {"file_path": str(tmp_path / "test_events.jsonl")},
-        "channels": [{"type": "telegram", "name": "telegram_channel", "token": "test_token"}],
-    }
-    config_file = tmp_path / "config.yml"
-    config_file.write_text(yaml.dump(config_data))
-    monkeypatch.setenv("CONFIG_FILE", str(config_file))
+    class MemoryTracker(ConversationTracker):
+        async def persist(self):
+            with self._persisting():
+                pass
 
-    importlib.reload(config_module)
-    importlib.reload(botapi)
+    trackers = {}
 
-    # Initialize botapi to load channels
-    botapi.app = FastAPI(title="Test Chatbot")
-    botapi.init()
+    async def fake_create_tracker(conv_id=None):
+        return trackers.setdefault(conv_id, MemoryTracker(conv_id=conv_id))
 
-    # Find the telegram channel instance
-    telegram_channel = None
-    for channel in botapi._registered_channels:
-        if isinstance(channel, TelegramChannel):
-            telegram_channel = channel
-            break
-    assert telegram_channel is not None
+    monkeypatch.setattr(telegram, "create_tracker", fake_create_tracker)
+    telegram_channel = telegram.TelegramChannel(name="telegram_channel", token="test_token")
 
-    # Manually call process_update with a dummy update to trigger event creation
     # In a real scenario, poll_updates would call process_update
     dummy_update = {
         "update_id": 12345,
@@ -302,10 +313,133 @@ async def test_telegram_channel_metadata(tmp_path, monkeypatch):
     await telegram_channel.process_update(dummy_update)
 
     # Verify that the channel name is in the event payload
-    tracker = await create_tracker(conv_id="123")  # conv_id is chat_id for telegram
+    tracker = trackers["123"]  # conv_id is chat_id for telegram
     last_event = tracker.last_user_message()
     assert last_event is not None
     assert last_event.payload.get("_channel") == "telegram_channel"
+    assert not tracker.has_pending()
+
+    # A re-delivered update is dropped instead of being handled twice
+    user_events = [e for e in tracker.events if e.type == "user"]
+    await telegram_channel.process_update(dummy_update)
+    assert [e for e in tracker.events if e.type == "user"] == user_events
+
+
+@pytest.mark.asyncio
+async def test_telegram_outbox_flushes_in_order(monkeypatch):
+    """
+    Replies queued through the outbox are sent in order per chat and flushed by close().
+    """
+    import asyncio
+
+    from botbase.channels.telegram import TelegramChannel
+
+    channel = TelegramChannel(name="telegram", token="test_token")
+    sent = []
+
+    async def fake_poll_updates():
+        await asyncio.Event().wait()
+
+    async def fake_send_message(chat_id, text):
+        await asyncio.sleep(0)
+        sent.append((chat_id, text))
+
+    monkeypatch.setattr(channel, "poll_updates", fake_poll_updates)
+    monkeypatch.setattr(channel, "send_message", fake_send_message)
+
+    await channel.start_polling_task()
+    for i in range(3):
+        for chat_id in (1, 2):
+            await channel.on_bot_event(Event(type="bot", text=str(i)), chat_id)
+    sender_tasks = list(channel._sender_tasks)
+    await channel.close()
+
+    # close() cancels and joins the polling and sender tasks
+    assert channel._polling_task.done()
+    assert all(task.done() for task in sender_tasks)
+    assert [text for chat_id, text in sent if chat_id == 1] == ["0", "1", "2"]
+    assert [text for chat_id, text in sent if chat_id == 2] == ["0", "1", "2"]
+
+
+@pytest.mark.asyncio
+async def test_telegram_close_waits_for_inflight_updates(monkeypatch):
+    """
+    close() lets updates being handled finish and send their replies, and never reopens the session.
+    """
+    import asyncio
+
+    from botbase.channels.telegram import TelegramChannel
+
+    channel = TelegramChannel(name="telegram", token="test_token")
+    sent = []
+    handling = asyncio.Event()
+
+    async def fake_poll_updates():
+        await asyncio.Event().wait()
+
+    async def fake_process_update(update):
+        handling.set()
+        await asyncio.sleep(0.01)
+        await channel.on_bot_event(Event(type="bot", text="late reply"), 1)
+
+    async def fake_send_message(chat_id, text):
+        await channel._get_session()
+        sent.append((chat_id, text))
+
+    monkeypatch.setattr(channel, "poll_updates", fake_poll_updates)
+    monkeypatch.setattr(channel, "process_update", fake_process_update)
+    monkeypatch.setattr(channel, "send_message", fake_send_message)
+
+    await channel.start_polling_task()
+    channel._update_slots = asyncio.Semaphore(1)
+    await channel._dispatch_update({"update_id": 1})
+    await handling.wait()
+    await channel.close()
+
+    assert sent == [(1, "late reply")]
+    assert channel._session.closed
+    with pytest.raises(RuntimeError):
+        await channel._get_session()
+
+
+@pytest.mark.asyncio
+async def test_telegram_poll_backs_off_on_api_errors(monkeypatch):
+    """
+    getUpdates answers without "ok" (e.g. 409 Conflict) back off instead of re-polling immediately.
+    """
+    import asyncio
+
+    from botbase.channels import telegram
+
+    class FakeResponse:
+        async def read(self):
+            return b'{"ok": false, "error_code": 409, "description": "Conflict", "parameters": {"retry_after": 3}}'
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, exc_type, exc_val, exc_tb):
+            pass
+
+    class FakeSession:
+        closed = False
+
+        def get(self, url, params=None, timeout=None):
+            return FakeResponse()
+
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        if len(sleeps) == 3:
+            raise asyncio.CancelledError
+
+    channel = telegram.TelegramChannel(name="telegram", token="test_token")
+    channel._session = FakeSession()
+    monkeypatch.setattr(telegram.asyncio, "sleep", fake_sleep)
+    with pytest.raises(asyncio.CancelledError):
+        await channel.poll_updates()
+    assert sleeps == [3, 3, 4]
 
 
 # --- Test Database Configuration ---
@@ -341,8 +475,6 @@ async def test_database_configuration():
 
 
 def test_runserver_interactive(monkeypatch):
-    original_argv = sys.argv.copy()
-    sys.argv.append("--interactive")
     called = False
 
     async def dummy_run(self):
@@ -352,6 +484,95 @@ def test_runserver_interactive(monkeypatch):
     from botbase.channels.interactive import InteractiveChannel
 
     monkeypatch.setattr(InteractiveChannel, "run", dummy_run)
-    botapi.runserver()
+    botapi.runserver(["--interactive"])
     assert called is True
-    sys.argv = original_argv
+
+
+def test_interactive_piped_input_skips_prompt_toolkit(tmp_path):
+    """
+    With stdin not a terminal, an interactive run prints plain text and never imports prompt_toolkit.
+    """
+    import os
+    import subprocess
+    import sys
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(botapi.__file__)))
+    script = (
+        "import asyncio, sys\n"
+        "from botbase.channels.interactive import InteractiveChannel\n"
+        "asyncio.run(InteractiveChannel().run())\n"
+        "print('prompt_toolkit' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        input="exit\n",
+        capture_output=True,
+        text=True,
+        cwd=tmp_path,
+        env={**os.environ, "CONFIG_FILE": str(tmp_path / "missing.yml"), "PYTHONPATH": package_root},
+        timeout=30,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "Interactive Terminal Chatbot." in result.stdout
+    assert result.stdout.splitlines()[-1] == "False"
+
+
+def test_parse_cli_args(capsys):
+    interactive, conv_id, remaining = botapi._parse_cli_args(["--interactive", "--conv-id", "abc", "--reload"])
+    assert interactive is True
+    assert conv_id == "abc"
+    assert remaining == ["--reload"]
+
+    assert botapi._parse_cli_args(["--conv-id=xyz"]) == (False, "xyz", [])
+    with pytest.raises(SystemExit):
+        botapi._parse_cli_args(["--conv-id"])
+
+    for flag in ("-h", "--help"):
+        with pytest.raises(SystemExit) as exc_info:
+            botapi._parse_cli_args(["--reload", flag])
+        assert exc_info.value.code == 0
+        assert "--conv-id ID" in capsys.readouterr().out
+
+
+def test_init_is_idempotent(monkeypatch):
+    from fastapi import FastAPI
+
+    monkeypatch.setattr(botapi, "_initialized", False)
+    monkeypatch.setattr(botapi, "_registered_channels", [])
+    monkeypatch.setattr(botapi, "app", FastAPI(title="Test Chatbot"), raising=False)
+    botapi.init()
+    middleware_count = len(botapi.app.user_middleware)
+    botapi.init()
+    assert len(botapi.app.user_middleware) == middleware_count
+
+
+def test_init_before_app_access(monkeypatch):
+    from botbase.config import ChannelConfig
+
+    monkeypatch.setattr(botapi, "_initialized", False)
+    monkeypatch.setattr(botapi, "_registered_channels", [])
+    # Not delattr: its hasattr() check would go through the lazy module __getattr__ and run init() already.
+    monkeypatch.delitem(vars(botapi), "app", raising=False)
+    monkeypatch.setattr(botapi.config, "channels", [ChannelConfig(type="webhook", name="webhook", url="")])
+    botapi.init()
+    assert len(botapi._registered_channels) == 1
+    assert botapi.app.user_middleware
+    assert any(getattr(route, "path", "").startswith("/channels/webhook") for route in botapi.app.routes)
+
+
+@pytest.mark.asyncio
+async def test_create_tracker_follows_tracker_type(tmp_path):
+    import botbase.config as config_module
+    from botbase.tracker.jsonl_tracker import JSONLTracker
+    from botbase.tracker.sqlite.tracker import SQLiteTracker
+
+    original = config_module.config.model_copy(deep=True)
+    try:
+        new_config = original.model_copy(deep=True)
+        new_config.tracker = "sqlite"
+        new_config.sqlite.db_path = str(tmp_path / "switch.db")
+        config_module.set_config(new_config)
+        assert isinstance(await create_tracker("switch"), SQLiteTracker)
+    finally:
+        config_module.set_config(original)
+    assert isinstance(await create_tracker("switch"), JSONLTracker)
@@ -7,22 +7,17 @@ import uuid
 from pathlib import Path
 
 import pytest
-import pytest_asyncio
 
 from botbase.config import JSONLConfig
 from botbase.tracker.base import Event
 from botbase.tracker.jsonl_tracker import JSONLTracker
 
 
-@pytest_asyncio.fixture
+@pytest.fixture
 def temp_jsonl(tmp_path: Path) -> str:
     file_path = tmp_path / "test_events.jsonl"
     file_path.touch()
-    yield str(file_path)
-    try:
-        os.remove(str(file_path))
-    except FileNotFoundError:
-        pass
+    return str(file_path)
 
 
 @pytest.fixture
@@ -43,10 +38,11 @@ async def test_jsonl_tracker_init(jsonl_config: JSONLConfig):
 async def test_jsonl_tracker_persist_and_load(jsonl_config: JSONLConfig):
     conv_id = str(uuid.uuid4())
     tracker = await JSONLTracker.create(jsonl_config, conv_id)
+    now = datetime.datetime.now(datetime.timezone.utc)
     test_events = [
-        Event(type="message", payload={"text": "Hello"}, created_at=datetime.datetime.now(datetime.timezone.utc)),
-        Event(type="slot", payload={"greeted": True}, created_at=datetime.datetime.now(datetime.timezone.utc)),
-        Event(type="message", payload={"text": "Goodbye"}, created_at=datetime.datetime.now(datetime.timezone.utc)),
+        Event(type="message", payload={"text": "Hello"}, created_at=now),
+        Event(type="slot", payload={"greeted": True}, created_at=now),
+        Event(type="message", payload={"text": "Goodbye"}, created_at=now),
     ]
     for event in test_events:
         tracker.add_event(event)
@@ -58,6 +54,7 @@ async def test_jsonl_tracker_persist_and_load(jsonl_config: JSONLConfig):
     for orig_event, loaded_event in zip(test_events, new_tracker.events):
         assert loaded_event.type == orig_event.type
         assert loaded_event.payload == orig_event.payload
+        assert loaded_event.created_at == orig_event.created_at
 
 
 @pytest.mark.asyncio
@@ -99,11 +96,10 @@ async def test_jsonl_tracker_concurrent_access(jsonl_config: JSONLConfig):
 
     async def add_events(count: int):
         tracker = await JSONLTracker.create(jsonl_config, conv_id)
+        now = datetime.datetime.now(datetime.timezone.utc)
         for i in range(count):
             # Provide created_at strictly.
-            tracker.add_event(
-                Event(type="message", payload={"count": i}, created_at=datetime.datetime.now(datetime.timezone.utc))
-            )
+            tracker.add_event(Event(type="message", payload={"count": i}, created_at=now))
         await tracker.persist()
 
     await asyncio.gather(
@@ -113,3 +109,84 @@ async def test_jsonl_tracker_concurrent_access(jsonl_config: JSONLConfig):
     )
     final_tracker = await JSONLTracker.create(jsonl_config, conv_id)
     assert len(final_tracker.events) == 15
+
+
+@pytest.mark.asyncio
+async def test_jsonl_tracker_loads_only_own_conversation(jsonl_config: JSONLConfig):
+    tracker_a = await JSONLTracker.create(jsonl_config, "conv-a")
+    tracker_b = await JSONLTracker.create(jsonl_config, "conv-b")
+    for i in range(3):
+        tracker_a.send_bot_message(f"a{i}")
+        tracker_b.send_bot_message(f"b{i}")
+        await tracker_a.persist()
+        await tracker_b.persist()
+
+    # Lines appended behind the tracker's back (e.g. by another process) are picked up too.
+    with open(jsonl_config.file_path, "ab") as f:
+        f.write(
+            b'{"conv_id": "conv-a", "event": '
+            b'{"type": "bot", "text": "external", "created_at": "2025-01-01T00:00:00"}}\n'
+        )
+
+    loaded_a = await JSONLTracker.create(jsonl_config, "conv-a")
+    loaded_b = await JSONLTracker.create(jsonl_config, "conv-b")
+    assert [e.text for e in loaded_a.events] == ["a0", "a1", "a2", "external"]
+    assert [e.text for e in loaded_b.events] == ["b0", "b1", "b2"]
+
+
+@pytest.mark.asyncio
+async def test_jsonl_tracker_indexes_partial_line_once_complete(jsonl_config: JSONLConfig):
+    record = b'{"conv_id": "conv-p", "event": {"type": "bot", "text": "late", "created_at": "2025-01-01T00:00:00"}}\n'
+    with open(jsonl_config.file_path, "ab") as f:
+        f.write(record[:20])
+    assert (await JSONLTracker.create(jsonl_config, "conv-p")).events == []
+
+    # Another writer finishes the line; the next load indexes it from where the last refresh stopped.
+    with open(jsonl_config.file_path, "ab") as f:
+        f.write(record[20:])
+    assert [e.text for e in (await JSONLTracker.create(jsonl_config, "conv-p")).events] == ["late"]
+
+
+@pytest.mark.asyncio
+async def test_jsonl_tracker_failed_persist_keeps_events_pending(jsonl_config: JSONLConfig, monkeypatch):
+    tracker = await JSONLTracker.create(jsonl_config, str(uuid.uuid4()))
+    tracker.send_bot_message("first")
+
+    def failing_append(conv_id, lines, fsync=False):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(tracker._index, "append", failing_append)
+    with pytest.raises(OSError):
+        await tracker.persist()
+    assert tracker.has_pending()
+
+    monkeypatch.undo()
+    tracker.send_bot_message("second")
+    await tracker.persist()
+    assert not tracker.has_pending()
+    new_tracker = await JSONLTracker.create(jsonl_config, tracker.conv_id)
+    assert [e.text for e in new_tracker.events] == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_jsonl_tracker_conv_ids_with_escapes(jsonl_config: JSONLConfig):
+    conv_ids = ['quote"d', "back\\slash", "ünïcode"]
+    for conv_id in conv_ids:
+        tracker = await JSONLTracker.create(jsonl_config, conv_id)
+        tracker.send_bot_message(conv_id)
+        await tracker.persist()
+
+    for conv_id in conv_ids:
+        loaded = await JSONLTracker.create(jsonl_config, conv_id)
+        assert [e.text for e in loaded.events] == [conv_id]
+
+
+@pytest.mark.asyncio
+async def test_jsonl_tracker_fsyncs_once_per_batch(temp_jsonl: str, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    tracker = await JSONLTracker.create(JSONLConfig(file_path=temp_jsonl, fsync=True), str(uuid.uuid4()))
+    for i in range(3):
+        tracker.send_bot_message(f"message {i}")
+    await tracker.persist()
+    assert len(synced) == 1
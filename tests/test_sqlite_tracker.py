@@ -2,41 +2,26 @@
 
 import asyncio
 import datetime
-import os
 import uuid
-from pathlib import Path
 
 import pytest
-import pytest_asyncio
 
 from botbase.config import SqliteTrackerConfig
 from botbase.tracker.base import Event
-from botbase.tracker.sqlite.database import Base, init_database
 from botbase.tracker.sqlite.tracker import SQLiteTracker
 
 
-@pytest_asyncio.fixture
-async def temp_db(tmp_path: Path) -> str:
+@pytest.fixture(scope="session")
+def temp_db() -> str:
     """
-    Create a temporary SQLite database file, initialize its tables,
-    yield the file path as a string, and then remove the file afterwards.
+    A shared-cache in-memory SQLite database used by the whole test session.
+    Its engine and schema are created once, by the first tracker; tests keep their rows apart
+    by using unique conv_ids.
     """
-    db_path = tmp_path / "test_conversations.db"
-    # Initialize the database; init_database returns a tuple (session_factory, db_file)
-    session_factory = await init_database(str(db_path))
-    engine = session_factory.kw["bind"]
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
-        await conn.run_sync(Base.metadata.create_all)
-    yield str(db_path)
-    # Clean up: remove the database file
-    try:
-        os.remove(str(db_path))
-    except FileNotFoundError:
-        pass
-
-
-@pytest_asyncio.fixture
+    return f"file:test_conversations_{uuid.uuid4().hex}?mode=memory&cache=shared"
+
+
+@pytest.fixture
 def sqlite_config(temp_db: str) -> SqliteTrackerConfig:
     """
     Return a SqliteTrackerConfig instance using the temporary database file.
@@ -57,10 +42,11 @@ async def test_sqlite_tracker_init(sqlite_config: SqliteTrackerConfig):
 async def test_sqlite_tracker_persist_and_load(sqlite_config: SqliteTrackerConfig):
     conv_id = str(uuid.uuid4())
     tracker = await SQLiteTracker.create(sqlite_config, conv_id)
+    now = datetime.datetime.now(datetime.timezone.utc)
     test_events = [
-        Event(type="message", payload={"text": "Hello"}, created_at=datetime.datetime.now(datetime.timezone.utc)),
-        Event(type="slot", payload={"name": "value"}, created_at=datetime.datetime.now(datetime.timezone.utc)),
-        Event(type="message", payload={"text": "Goodbye"}, created_at=datetime.datetime.now(datetime.timezone.utc)),
+        Event(type="message", payload={"text": "Hello"}, created_at=now),
+        Event(type="slot", payload={"name": "value"}, created_at=now),
+        Event(type="message", payload={"text": "Goodbye"}, created_at=now),
     ]
     for event in test_events:
         tracker.add_event(event)
@@ -111,10 +97,9 @@ async def test_sqlite_tracker_concurrent_access(sqlite_config: SqliteTrackerConf
 
     async def add_events(count: int):
         tracker = await SQLiteTracker.create(sqlite_config, conv_id)
+        now = datetime.datetime.now(datetime.timezone.utc)
         for i in range(count):
-            tracker.add_event(
-                Event(type="message", payload={"count": i}, created_at=datetime.datetime.now(datetime.timezone.utc))
-            )
+            tracker.add_event(Event(type="message", payload={"count": i}, created_at=now))
         await tracker.persist()
 
     await asyncio.gather(
@@ -124,3 +109,20 @@ async def test_sqlite_tracker_concurrent_access(sqlite_config: SqliteTrackerConf
     )
     final_tracker = await SQLiteTracker.create(sqlite_config, conv_id)
     assert len(final_tracker.events) == 15
+
+
+@pytest.mark.asyncio
+async def test_sqlite_tracker_loads_only_current_session(sqlite_config: SqliteTrackerConfig):
+    conv_id = str(uuid.uuid4())
+    tracker = await SQLiteTracker.create(sqlite_config, conv_id)
+    tracker.set_slot("old_slot", 1)
+    tracker.send_bot_message("before")
+    await tracker.persist()
+    tracker.renew_session()
+    tracker.send_bot_message("after")
+    await tracker.persist()
+
+    new_tracker = await SQLiteTracker.create(sqlite_config, conv_id)
+    assert [e.type for e in new_tracker.events] == ["session", "bot"]
+    assert new_tracker.events[-1].text == "after"
+    assert new_tracker.get_slot("old_slot") is None